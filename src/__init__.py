@@ -28,7 +28,9 @@ Cliente:
 __version__ = "1.0.0"
 __author__ = "Grupo 05 - Redes de Computadoras UdelaR"
 
-from .client import connect, Client
+from .client import connect, Client, ErrorRPC
 from .server import Server
+from .async_server import AsyncServer
+from .async_client import connect_async, AsyncClient
 
-__all__ = ['connect', 'Client', 'Server']
+__all__ = ['connect', 'Client', 'ErrorRPC', 'Server', 'AsyncServer', 'connect_async', 'AsyncClient']
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from xmlrpc_redes import (
+    construir_llamado_xml, parsear_respuesta_xml, construir_llamado_http_partes,
+    conexion_persistente, descomprimir, MIN_COMPRIMIR, NIVEL_COMPRESION, LectorHTTP, ErrorHTTP,
+    ParserRespuesta
+)
+from client import error_rpc, respuesta_comprimida
+from buffers import recibir_encabezado_async, recibir_cuerpo_async
+
+Conexion = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncClient:
+    """Cliente XML-RPC para asyncio: await conn.metodo(args).
+
+    Mantiene un pool de conexiones keep-alive propio (del event loop en que se
+    usa) y limita a max_conexiones los llamados simultaneos en vuelo, de modo que
+    asyncio.gather de cientos de llamados reutiliza unos pocos sockets.
+    """
+
+    def __init__(self, address: str, port: int, timeout: float, max_conexiones: int = 64,
+                 max_inactividad: float = 10.0, compresion: bool = False,
+                 min_comprimir: int = MIN_COMPRIMIR, nivel_compresion: int = NIVEL_COMPRESION,
+                 arreglos: bool = False):
+        self.addr = address
+        self.port = port
+        self.timeout = timeout
+        self.max_conexiones = max_conexiones
+        self.max_inactividad = max_inactividad
+        # Igual que en Client: gzip/deflate en las respuestas y gzip en los llamados grandes
+        self.compresion = compresion
+        self.min_comprimir = min_comprimir
+        self.nivel_compresion = nivel_compresion
+        self.arreglos = arreglos
+        self._libres: List[Tuple[Conexion, float]] = []
+        self._semaforo: Optional[asyncio.Semaphore] = None
+
+    def __getattr__(self, method_name: str):
+        async def _remote_call(*args):
+            return await self._invoke(method_name, list(args))
+        return _remote_call
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        libres, self._libres = self._libres, []
+        for (_, writer), _ in libres:
+            writer.close()
+
+    async def _invoke(self, method: str, params: List[Any]) -> Any:
+        return await self.llamar_xml(construir_llamado_xml(method, params))
+
+    async def llamar_xml(self, body: Union[str, bytes]) -> Any:
+        """Como Client.llamar_xml."""
+        http = construir_llamado_http_partes(f"{self.addr}:{self.port}", body, True,
+                                             self.compresion, self.min_comprimir, self.nivel_compresion)
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_conexiones)
+        async with self._semaforo:
+            encabezados, cuerpo = await asyncio.wait_for(self._llamar(http), self.timeout)
+        if isinstance(cuerpo, ParserRespuesta):
+            ok, res = cuerpo.resultado()
+        else:
+            codificacion = encabezados.get("content-encoding", "identity")
+            if codificacion.lower() != "identity":
+                cuerpo = descomprimir(cuerpo, codificacion)
+            ok, res = parsear_respuesta_xml(cuerpo, self.arreglos)
+        if not ok:
+            raise error_rpc(res)
+        return res
+
+    async def _llamar(self, http: List[bytes]) -> Tuple[Dict[str, str], Union[bytearray, ParserRespuesta]]:
+        conexion, reutilizada = await self._obtener()
+        try:
+            try:
+                llamado, encabezados, cuerpo, completo = await self._enviar_y_recibir(conexion, http, self.arreglos)
+            except ConnectionError:
+                if not reutilizada:
+                    raise
+                # El servidor cerro la conexion ociosa: reintentar en una nueva
+                conexion[1].close()
+                conexion, reutilizada = await self._obtener(reutilizar=False)
+                llamado, encabezados, cuerpo, completo = await self._enviar_y_recibir(conexion, http, self.arreglos)
+        except BaseException:
+            # Incluye la cancelacion por timeout: el socket queda en estado incierto
+            conexion[1].close()
+            raise
+        if completo and conexion_persistente(llamado, encabezados):
+            self._libres.append((conexion, time.monotonic()))
+        else:
+            conexion[1].close()
+        return encabezados, cuerpo
+
+    async def _obtener(self, reutilizar: bool = True) -> Tuple[Conexion, bool]:
+        ahora = time.monotonic()
+        while reutilizar and self._libres:
+            (reader, writer), usada = self._libres.pop()
+            if ahora - usada <= self.max_inactividad and not reader.at_eof() and not writer.is_closing():
+                return (reader, writer), True
+            writer.close()
+        return await asyncio.open_connection(self.addr, self.port), False
+
+    @staticmethod
+    async def _enviar_y_recibir(conexion: Conexion, http: List[bytes], arreglos: bool = False
+                                ) -> Tuple[str, Dict[str, str], Union[bytearray, ParserRespuesta], bool]:
+        """Igual que Client._enviar_y_recibir pero sobre streams de asyncio."""
+        reader, writer = conexion
+        writer.writelines(http)
+        await writer.drain()
+        lector = LectorHTTP(respuesta=True)
+        if not await recibir_encabezado_async(reader, lector):
+            if lector.pendientes:
+                raise ErrorHTTP("Respuesta HTTP incompleta")
+            raise ConnectionError("El servidor cerró la conexión sin responder")
+        if lector.largo is None:
+            # Chunked o sin delimitar: se parsea a medida que llega
+            parser = ParserRespuesta(arreglos)
+            descompresor = respuesta_comprimida(lector.encabezados, parser.alimentar)
+            completo = await recibir_cuerpo_async(reader, lector,
+                                                  descompresor.alimentar if descompresor else parser.alimentar)
+            if lector.chunked and not completo:
+                raise ErrorHTTP("Respuesta HTTP incompleta")
+            if descompresor is not None:
+                descompresor.terminar()
+            return lector.llamado, lector.encabezados, parser, lector.chunked and not lector.pendientes
+        cuerpo = bytearray()
+        completo = await recibir_cuerpo_async(reader, lector, cuerpo.extend)
+        return lector.llamado, lector.encabezados, cuerpo, completo and not lector.pendientes
+
+
+def connect_async(address: str, port: int, timeout: float = 20.0, max_conexiones: int = 64,
+                  compresion: bool = False, arreglos: bool = False,
+                  max_inactividad: float = 10.0) -> AsyncClient:
+    return AsyncClient(address, port, timeout, max_conexiones, max_inactividad,
+                       compresion=compresion, arreglos=arreglos)
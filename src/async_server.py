@@ -0,0 +1,244 @@
+import asyncio
+import inspect
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Tuple, Union
+
+from xmlrpc_redes import (
+    ParserLlamado, construir_respuesta_http,
+    construir_respuesta_xml, construir_error_xml, iterar_respuesta_xml, RespuestaEnPedazos, EscritorChunked,
+    MIN_COMPRIMIR, NIVEL_COMPRESION, LectorHTTP, ErrorHTTP, MAX_ENCABEZADO
+)
+from server import (
+    Server, FaultRPC, ERROR_EN_PARAMS, ERROR_INTERNO, OTRO_ERROR, es_iterador, _SIN_ITEMS
+)
+from buffers import recibir_encabezado_async, recibir_cuerpo_async
+
+
+class AsyncServer(Server):
+    """Servidor XML-RPC basado en asyncio.
+
+    Cada conexion es una corrutina y no un hilo, por lo que puede mantener miles
+    de conexiones ociosas o lentas en un solo proceso. Los métodos definidos con
+    async def se esperan directamente en el event loop; las funciones comunes se
+    ejecutan en un pool de hilos (max_workers) para no bloquearlo.
+    Reusa el registro de métodos, la validación HTTP y el parseo de Server.
+    """
+
+    def __init__(self, address: Tuple[str, int], timeout_inactividad: float = 15.0,
+                 max_llamados_por_conexion: int = 100, max_workers: Optional[int] = None,
+                 max_bytes_respuestas: int = 32 * 1024 * 1024, compresion: bool = True,
+                 min_comprimir: int = MIN_COMPRIMIR, nivel_compresion: int = NIVEL_COMPRESION,
+                 arreglos: bool = False):
+        super().__init__(address, timeout_inactividad, max_llamados_por_conexion,
+                         max_bytes_respuestas=max_bytes_respuestas, compresion=compresion,
+                         min_comprimir=min_comprimir, nivel_compresion=nivel_compresion,
+                         arreglos=arreglos)
+        self.max_workers = max_workers
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.methods["system.multicall"] = self.system_multicall_async
+
+    def _servir(self, reuse_port: bool) -> None:
+        # Server.serve decide si hay un solo proceso o pre-fork con supervisor
+        asyncio.run(self.serve_async(reuse_port))
+
+    async def serve_async(self, reuse_port: bool = False) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="xmlrpc_redes")
+        try:
+            servidor = await asyncio.start_server(
+                self.atender_cliente_async, self.address[0], self.address[1],
+                limit=MAX_ENCABEZADO, reuse_address=True, reuse_port=reuse_port or None
+            )
+            self.sock = servidor
+            print(f"[xmlrpc_redes] AsyncServer escuchando en {self.address[0]}:{self.address[1]} (pid {os.getpid()})")
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False)
+
+    async def atender_cliente_async(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Version asyncio de Server.atender_cliente (mismo manejo de keep-alive)."""
+        try:
+            lector = LectorHTTP()
+            atendidos = 0
+            while True:
+                try:
+                    if not await recibir_encabezado_async(reader, lector, self.timeout_inactividad):
+                        return
+                except (asyncio.TimeoutError, ConnectionError):
+                    # Timeout de inactividad o conexion reseteada
+                    return
+                except ErrorHTTP as e:
+                    await self.error_async(writer, OTRO_ERROR, str(e))
+                    return
+
+                try:
+                    parser, descompresor, crudo = self.preparar_llamado(lector)
+                except FaultRPC as f:
+                    await self.error_async(writer, f.codigo, f.mensaje)
+                    return
+
+                # El cuerpo se parsea (y descomprime) a medida que llega, salvo que
+                # pueda estar en el cache de respuestas: ahi se junta entero
+                completo = bytearray()
+                if crudo:
+                    recibir = completo.extend
+                else:
+                    recibir = descompresor.alimentar if descompresor is not None else parser.alimentar
+                try:
+                    await recibir_cuerpo_async(reader, lector, recibir, self.timeout_inactividad)
+                    if descompresor is not None and lector.terminado:
+                        descompresor.terminar()
+                except (asyncio.TimeoutError, ConnectionError):
+                    return
+                except ValueError as e:
+                    # Chunk mal formado o cuerpo gzip/deflate corrupto
+                    await self.error_async(writer, OTRO_ERROR, str(e))
+                    return
+
+                atendidos += 1
+                persistente, codificacion = self.terminar_llamado(lector, atendidos)
+                clave = None
+                if crudo:
+                    clave, http = self.respuesta_cacheada(completo, persistente, codificacion)
+                    if http is not None:
+                        writer.write(http)
+                        await writer.drain()
+                        if not persistente:
+                            return
+                        continue
+                    parser.alimentar(completo)
+
+                method, resp_xml = await self.responder_async(parser)
+                if not isinstance(resp_xml, str):
+                    if not await self.enviar_pedazos_async(writer, method, resp_xml, persistente, codificacion):
+                        return
+                    if not persistente:
+                        return
+                    continue
+                writer.writelines(self.armar_respuesta(method, resp_xml, persistente, codificacion, clave))
+                await writer.drain()
+                if not persistente:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def responder_async(self, parser: ParserLlamado) -> Tuple[Optional[str], Union[str, Iterator, AsyncIterator]]:
+        """Como Server.responder, esperando los métodos async def. Los
+        generadores async def tambien se responden en pedazos."""
+        try:
+            method, params = self.leer_llamado(parser)
+            func = self.buscar_metodo(method)
+            loop = asyncio.get_running_loop()
+            if inspect.iscoroutinefunction(func):
+                res = await self.ejecutar_async(func, params)
+            else:
+                res = await loop.run_in_executor(self.executor, self.ejecutar, func, params)
+            if inspect.isasyncgen(res):
+                primero = await self.ejecutar_async(_siguiente_async, [res])
+                if primero is _SIN_ITEMS:
+                    return method, construir_respuesta_xml([])
+                return method, _iterar_respuesta_async(primero, res)
+            if es_iterador(res):
+                primero = await loop.run_in_executor(self.executor, self.ejecutar, next, [res, _SIN_ITEMS])
+                if primero is _SIN_ITEMS:
+                    return method, construir_respuesta_xml([])
+                return method, iterar_respuesta_xml(itertools.chain([primero], res))
+        except FaultRPC as f:
+            return None, construir_error_xml(f.codigo, f.mensaje)
+        return method, construir_respuesta_xml(res)
+
+    async def siguiente_pedazo(self, pedazos: Union[Iterator, AsyncIterator]) -> Optional[str]:
+        """Proximo pedazo de XML (None al terminar). Los generadores comunes
+        avanzan en el pool de hilos para no bloquear el event loop."""
+        if hasattr(pedazos, "__anext__"):
+            try:
+                return await pedazos.__anext__()
+            except StopAsyncIteration:
+                return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, next, pedazos, None)
+
+    async def enviar_pedazos_async(self, writer: asyncio.StreamWriter, method: str,
+                                   pedazos: Union[Iterator, AsyncIterator],
+                                   persistente: bool, codificacion: Optional[str]) -> bool:
+        """Como Server.enviar_pedazos, sobre un StreamWriter."""
+        escritor = EscritorChunked(not persistente, codificacion, self.nivel_compresion)
+        partes = [escritor.encabezado()]
+        while True:
+            try:
+                xml = await self.siguiente_pedazo(pedazos)
+            except Exception as e:
+                print(f"[xmlrpc_redes] Error en el resultado de {method}: {e}")
+                return False
+            if xml is None:
+                break
+            partes += escritor.pedazo(xml)
+            writer.writelines(partes)
+            await writer.drain()
+            partes = []
+        writer.writelines(partes + escritor.terminar())
+        await writer.drain()
+        return True
+
+    async def system_multicall_async(self, llamados: List[Any]) -> List[Any]:
+        """Como Server.system_multicall, esperando los métodos async def y
+        ejecutando el resto en el pool de hilos."""
+        if not isinstance(llamados, list):
+            raise TypeError("system.multicall espera un array de llamados")
+        loop = asyncio.get_running_loop()
+        resultados: List[Any] = []
+        for llamado in llamados:
+            try:
+                method, params = self.leer_llamado_multicall(llamado)
+                func = self.buscar_metodo(method)
+                if inspect.iscoroutinefunction(func):
+                    res = await self.ejecutar_async(func, params)
+                else:
+                    res = await loop.run_in_executor(self.executor, self.ejecutar, func, params)
+                if inspect.isasyncgen(res):
+                    res = await self.ejecutar_async(_lista_async, [res])
+                elif es_iterador(res):
+                    res = await loop.run_in_executor(self.executor, self.ejecutar, list, [res])
+                resultados.append([res])
+            except FaultRPC as f:
+                resultados.append({"faultCode": f.codigo, "faultString": f.mensaje})
+        return resultados
+
+    async def ejecutar_async(self, func: Callable[..., Any], params: List[Any]) -> Any:
+        try:
+            return await func(*params)
+        except TypeError as e:
+            raise FaultRPC(ERROR_EN_PARAMS, f"Error en parámetros del método invocado: {e}")
+        except Exception as e:
+            raise FaultRPC(ERROR_INTERNO, f"Error interno en la ejecución del método: {e}")
+
+    async def error_async(self, writer: asyncio.StreamWriter, num_err: int, mensaje_err: str):
+        resp_xml = construir_error_xml(num_err, mensaje_err)
+        writer.write(construir_respuesta_http(resp_xml))
+        await writer.drain()
+
+
+async def _siguiente_async(generador: AsyncIterator) -> Any:
+    try:
+        return await generador.__anext__()
+    except StopAsyncIteration:
+        return _SIN_ITEMS
+
+
+async def _lista_async(generador: AsyncIterator) -> List[Any]:
+    return [item async for item in generador]
+
+
+async def _iterar_respuesta_async(primero: Any, resto: AsyncIterator) -> AsyncIterator[str]:
+    """iterar_respuesta_xml para un generador async def ya arrancado."""
+    respuesta = RespuestaEnPedazos()
+    yield respuesta.agregar(primero) or respuesta.vaciar()
+    async for item in resto:
+        pedazo = respuesta.agregar(item)
+        if pedazo:
+            yield pedazo
+    yield respuesta.terminar()
@@ -0,0 +1,10 @@
+"""Herramientas de medicion para xmlrpc_redes.
+
+Se ejecutan como modulo desde src/:
+
+    python -m bench codec      # micro-benchmarks del codec XML y HTTP
+    python -m bench load       # generador de carga contra un servidor
+    python -m bench replay     # reproduce el trafico de una captura pcap
+    python -m bench wan        # keep-alive, multicall y gzip con un enlace WAN emulado
+    python -m bench paridad    # comparacion con xmlrpc.client y xmlrpc.server
+"""
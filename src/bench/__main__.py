@@ -0,0 +1,21 @@
+import argparse
+import sys
+from typing import List, Optional
+
+from bench import codec, load, replay, wan, paridad
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Mediciones de xmlrpc_redes")
+    comandos = parser.add_subparsers(dest="comando", metavar="comando", required=True)
+    for modulo in (codec, load, replay, wan, paridad):
+        nombre = modulo.__name__.rsplit(".", 1)[-1]
+        modulo.configurar(comandos.add_parser(nombre, help=modulo.__doc__.splitlines()[0],
+                                              description=modulo.__doc__,
+                                              formatter_class=argparse.RawDescriptionHelpFormatter))
+    args = parser.parse_args(argv)
+    return args.ejecutar(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
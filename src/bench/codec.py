@@ -0,0 +1,266 @@
+"""Micro-benchmarks del codec XML-RPC y de las funciones HTTP.
+
+Mide cada operacion de xmlrpc_redes.py sobre cargas representativas y reporta
+operaciones por segundo, bytes por segundo (del XML o mensaje HTTP que se arma
+o se parsea; "-" para serializacion y deserializacion, que van entre valores y
+arboles ElementTree) y el pico de memoria de una ejecucion. Con --json se guardan los
+resultados para compararlos entre versiones con --comparar.
+
+    python -m bench codec
+    python -m bench codec --cargas arreglo_int,fault --json nuevo.json
+    python -m bench codec --comparar viejo.json
+"""
+import argparse
+import gc
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from xmlrpc_redes import (
+    serializacion, deserializacion, construir_llamado_xml, parsear_llamado_xml, ParserLlamado,
+    construir_respuesta_xml, construir_error_xml, parsear_respuesta_xml,
+    construir_llamado_http, parsear_llamado_http, construir_respuesta_http, parsear_respuesta_http,
+    LectorHTTP
+)
+
+METODO = "benchmark"
+HOST = "127.0.0.1:8000"
+# Como llegan los cuerpos del socket (buffers.TAM_PEDAZO)
+TAM_PEDAZO = 65536
+
+_PALABRAS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+             "incididunt ut labore et dolore magna aliqua año niño").split()
+
+
+def _texto(palabras: int) -> str:
+    rnd = random.Random(0)
+    return " ".join(rnd.choice(_PALABRAS) for _ in range(palabras))
+
+
+def _struct_profundo(niveles: int = 64) -> Dict[str, Any]:
+    nodo: Dict[str, Any] = {"hoja": True}
+    for i in range(niveles):
+        nodo = {"id": i, "nombre": f"nodo {i}", "peso": i * 0.25, "etiquetas": ["a", "b", "c"], "hijo": nodo}
+    return nodo
+
+
+# nombre: params del llamado (el resultado es params[0], o params si hay varios)
+CARGAS: Dict[str, Callable[[], List[Any]]] = {
+    "escalares": lambda: [42, True, 3.25, "hola <mundo>", datetime(2025, 3, 14, 15, 9, 26)],
+    "texto_20k": lambda: [_texto(20000)],
+    "struct_profundo": lambda: [_struct_profundo()],
+    "arreglo_int": lambda: [list(range(-500_000, 500_000))],
+    "arreglo_float": lambda: [[i * 0.37 for i in range(1_000_000)]],
+    "base64": lambda: [bytes(range(256)) * 4096],
+    "fault": lambda: [{"faultCode": 4, "faultString": "Error interno: " + _texto(20)}],
+}
+
+
+class Carga:
+    """Una carga ya convertida a cada representacion que usan las operaciones."""
+
+    def __init__(self, nombre: str, params: List[Any]):
+        self.nombre = nombre
+        self.params = params
+        self.valor = params[0] if len(params) == 1 else params
+        self.fault = (self.valor["faultCode"], self.valor["faultString"]) if nombre == "fault" else None
+        self.elem = serializacion(self.valor)
+        self.xml_llamado = construir_llamado_xml(METODO, params)
+        self.llamado = self.xml_llamado.encode()
+        if self.fault:
+            self.xml_respuesta = construir_error_xml(*self.fault)
+        else:
+            self.xml_respuesta = construir_respuesta_xml(self.valor)
+        self.respuesta = self.xml_respuesta.encode()
+        self.http_llamado = construir_llamado_http(HOST, self.xml_llamado)
+        self.http_respuesta = construir_respuesta_http(self.xml_respuesta)
+
+
+def _parser_incremental(xml: bytes) -> Tuple[str, List[Any]]:
+    parser = ParserLlamado()
+    vista = memoryview(xml)
+    for i in range(0, len(vista), TAM_PEDAZO):
+        parser.alimentar(vista[i:i + TAM_PEDAZO])
+    return parser.resultado()
+
+
+def _leer_http(mensaje: bytes) -> bytearray:
+    lector = LectorHTTP(respuesta=True)
+    vista = memoryview(mensaje)
+    cuerpo = bytearray()
+    for i in range(0, len(vista), TAM_PEDAZO):
+        lector.alimentar(vista[i:i + TAM_PEDAZO])
+        if lector.encabezado():
+            pedazo = lector.cuerpo()
+            while pedazo:
+                cuerpo += pedazo
+                pedazo = lector.cuerpo()
+    return cuerpo
+
+
+def _sin_fault(c: Carga) -> bool:
+    return c.fault is None
+
+
+def _todas(c: Carga) -> bool:
+    return True
+
+
+# (nombre, operacion, atributo con los bytes que procesa, a que cargas aplica).
+# serializacion y deserializacion no arman ni leen bytes: no tienen atributo
+OPERACIONES: List[Tuple[str, Callable[[Carga], Any], Optional[str], Callable[[Carga], bool]]] = [
+    ("serializacion", lambda c: serializacion(c.valor), None, _sin_fault),
+    ("deserializacion", lambda c: deserializacion(c.elem), None, _sin_fault),
+    ("construir_llamado_xml", lambda c: construir_llamado_xml(METODO, c.params), "llamado", _sin_fault),
+    ("parsear_llamado_xml", lambda c: parsear_llamado_xml(c.llamado), "llamado", _sin_fault),
+    ("ParserLlamado", lambda c: _parser_incremental(c.llamado), "llamado", _sin_fault),
+    ("construir_respuesta_xml", lambda c: construir_respuesta_xml(c.valor), "respuesta", _sin_fault),
+    ("construir_error_xml", lambda c: construir_error_xml(*c.fault), "respuesta", lambda c: c.fault is not None),
+    ("parsear_respuesta_xml", lambda c: parsear_respuesta_xml(c.respuesta), "respuesta", _todas),
+    ("construir_llamado_http", lambda c: construir_llamado_http(HOST, c.xml_llamado), "http_llamado", _sin_fault),
+    ("parsear_llamado_http", lambda c: parsear_llamado_http(c.http_llamado), "http_llamado", _sin_fault),
+    ("construir_respuesta_http", lambda c: construir_respuesta_http(c.xml_respuesta), "http_respuesta", _todas),
+    ("parsear_respuesta_http", lambda c: parsear_respuesta_http(c.http_respuesta), "http_respuesta", _todas),
+    ("LectorHTTP", lambda c: _leer_http(c.http_respuesta), "http_respuesta", _todas),
+]
+
+
+def _correr(operacion: Callable[[Carga], Any], carga: Carga, veces: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(veces):
+        operacion(carga)
+    return time.perf_counter() - t0
+
+
+def medir(operacion: Callable[[Carga], Any], carga: Carga, tiempo: float, rondas: int) -> Tuple[float, int]:
+    """Mejor tiempo por operacion (segundos) entre rondas de al menos tiempo
+    segundos, y la cantidad total de ejecuciones."""
+    veces = 1
+    t = _correr(operacion, carga, veces)
+    while t < tiempo:
+        veces = min(veces * 10, math.ceil(veces * tiempo * 1.2 / t)) if t > 0 else veces * 10
+        t = _correr(operacion, carga, veces)
+    tiempos = [t] + [_correr(operacion, carga, veces) for _ in range(rondas - 1)]
+    return min(tiempos) / veces, veces * len(tiempos)
+
+
+def pico_memoria(operacion: Callable[[Carga], Any], carga: Carga) -> int:
+    """Bytes reservados de mas en el peor momento de una ejecucion (incluye el resultado)."""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    resultado = operacion(carga)
+    pico = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    del resultado
+    return pico
+
+
+def correr(cargas: List[str], operaciones: List[str], tiempo: float, rondas: int,
+           informar: Callable[[Dict[str, Any]], None]) -> List[Dict[str, Any]]:
+    resultados = []
+    for nombre in cargas:
+        # Las cargas grandes se arman de a una para no tenerlas todas en memoria
+        carga = Carga(nombre, CARGAS[nombre]())
+        for op, funcion, atributo, aplica in OPERACIONES:
+            if op not in operaciones or not aplica(carga):
+                continue
+            segundos, ejecuciones = medir(funcion, carga, tiempo, rondas)
+            tam = len(getattr(carga, atributo)) if atributo else None
+            resultado = {
+                "carga": nombre,
+                "operacion": op,
+                "ops_seg": 1 / segundos,
+                "bytes_seg": tam / segundos if tam is not None else None,
+                "bytes": tam,
+                "pico_memoria": pico_memoria(funcion, carga),
+                "ejecuciones": ejecuciones,
+            }
+            resultados.append(resultado)
+            informar(resultado)
+        del carga
+    return resultados
+
+
+def _cantidad(x: float) -> str:
+    for limite, sufijo in ((1e9, "G"), (1e6, "M"), (1e3, "k")):
+        if x >= limite:
+            return f"{x / limite:.1f}{sufijo}"
+    return f"{x:.1f}"
+
+
+def _fila(r: Dict[str, Any], anterior: Optional[Dict[str, Any]]) -> str:
+    bytes_seg = _cantidad(r["bytes_seg"]) + "B" if r["bytes_seg"] is not None else "-"
+    fila = (f"{r['carga']:<16} {r['operacion']:<25} {_cantidad(r['ops_seg']):>8} "
+            f"{bytes_seg:>9} {_cantidad(r['pico_memoria']) + 'B':>9}")
+    if anterior is not None:
+        fila += f" {r['ops_seg'] / anterior['ops_seg']:>8.2f}x"
+    return fila
+
+
+def ejecutar(args: argparse.Namespace) -> int:
+    salida = sys.stderr if args.json == "-" else sys.stdout
+    anteriores: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anteriores = {(r["carga"], r["operacion"]): r for r in json.load(f)["resultados"]}
+    encabezado = f"{'carga':<16} {'operacion':<25} {'ops/s':>8} {'bytes/s':>9} {'pico':>9}"
+    print(encabezado + (f" {'vs ant.':>9}" if anteriores else ""), file=salida)
+
+    def informar(r: Dict[str, Any]) -> None:
+        print(_fila(r, anteriores.get((r["carga"], r["operacion"]))), file=salida, flush=True)
+
+    resultados = correr(args.cargas, args.operaciones, args.tiempo, args.rondas, informar)
+    if args.json:
+        informe = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "etiqueta": args.etiqueta,
+            "python": platform.python_version(),
+            "implementacion": platform.python_implementation(),
+            "plataforma": platform.platform(),
+            "tiempo": args.tiempo,
+            "rondas": args.rondas,
+            "resultados": resultados,
+        }
+        if args.json == "-":
+            json.dump(informe, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(informe, f, indent=2)
+    return 0
+
+
+def _lista(opciones: List[str]) -> Callable[[str], List[str]]:
+    def convertir(texto: str) -> List[str]:
+        nombres = [n.strip() for n in texto.split(",") if n.strip()]
+        desconocidos = [n for n in nombres if n not in opciones]
+        if desconocidos:
+            raise argparse.ArgumentTypeError(
+                f"desconocido: {', '.join(desconocidos)} (opciones: {', '.join(opciones)})")
+        return nombres
+    return convertir
+
+
+def configurar(parser: argparse.ArgumentParser) -> None:
+    nombres_ops = [op[0] for op in OPERACIONES]
+    parser.add_argument("--cargas", type=_lista(list(CARGAS)), default=list(CARGAS),
+                        help=f"separadas por coma (por defecto todas: {', '.join(CARGAS)})")
+    parser.add_argument("--operaciones", type=_lista(nombres_ops), default=nombres_ops,
+                        help="separadas por coma (por defecto todas)")
+    parser.add_argument("--tiempo", type=float, default=0.5,
+                        help="segundos minimos de cada ronda (por defecto 0.5)")
+    parser.add_argument("--rondas", type=int, default=3,
+                        help="se reporta la mejor de las rondas (por defecto 3)")
+    parser.add_argument("--json", metavar="ARCHIVO",
+                        help="guarda los resultados en JSON ('-' para stdout)")
+    parser.add_argument("--comparar", metavar="ARCHIVO",
+                        help="JSON de una corrida anterior: agrega la relacion de ops/s")
+    parser.add_argument("--etiqueta", default="", help="nombre de la corrida en el JSON (ej. la version)")
+    parser.set_defaults(ejecutar=ejecutar)
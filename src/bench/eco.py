@@ -0,0 +1,29 @@
+"""Metodos que registran los servidores de `bench paridad` (el nuestro y el de
+la biblioteca estandar), para mandar cualquier carga y medir la memoria."""
+import resource
+import sys
+
+
+def eco(*params):
+    """Devuelve lo recibido: el parametro, o la lista si son varios."""
+    return params[0] if len(params) == 1 else list(params)
+
+
+def fallar(mensaje: str):
+    raise ValueError(mensaje)
+
+
+def memoria_pico_kb() -> int:
+    """Pico de memoria residente del proceso servidor, en KB."""
+    # En Linux ru_maxrss hereda el pico del proceso que lo lanzo (fork + exec);
+    # VmHWM es solo el de este programa
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmHWM:"):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS la da en bytes, el resto de los Unix en KB
+    return pico // 1024 if sys.platform == "darwin" else pico
@@ -0,0 +1,89 @@
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class Histograma:
+    """Histograma de latencias al estilo HDR.
+
+    Guarda microsegundos enteros en cubetas log-lineales: 2**bits cubetas por
+    cada potencia de 2, asi el error relativo de cualquier percentil es menor a
+    2**-(bits-1) (bits=7: menos de 1,6%) con memoria acotada, sin importar si
+    las latencias son de microsegundos o de minutos. Los histogramas se pueden
+    sumar (agregar) y pasar a JSON (como_dict / desde_dict).
+    """
+
+    def __init__(self, bits: int = 7):
+        self.bits = bits
+        self.cuentas: Dict[int, int] = {}
+        self.total = 0
+        self.suma = 0
+        self.minimo = 0
+        self.maximo = 0
+
+    def registrar(self, segundos: float) -> None:
+        v = max(int(segundos * 1e6), 0)
+        e = max(v.bit_length() - self.bits, 0)
+        i = (e << self.bits) | (v >> e)
+        self.cuentas[i] = self.cuentas.get(i, 0) + 1
+        if not self.total or v < self.minimo:
+            self.minimo = v
+        if v > self.maximo:
+            self.maximo = v
+        self.total += 1
+        self.suma += v
+
+    def _valor(self, i: int) -> int:
+        # El mayor valor que cae en la cubeta (como hace HDR)
+        e, m = i >> self.bits, i & ((1 << self.bits) - 1)
+        return min(((m + 1) << e) - 1, self.maximo)
+
+    def cubetas(self) -> Iterator[Tuple[int, int]]:
+        """(valor en µs, cuenta) en orden creciente."""
+        for i in sorted(self.cuentas):
+            yield self._valor(i), self.cuentas[i]
+
+    def percentil(self, p: float) -> float:
+        """Latencia en segundos por debajo de la cual queda el p% de los registros."""
+        if not self.total:
+            return 0.0
+        objetivo = max(p / 100 * self.total, 1)
+        acumulado = 0
+        for valor, cuenta in self.cubetas():
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return valor / 1e6
+        return self.maximo / 1e6
+
+    @property
+    def media(self) -> float:
+        return self.suma / self.total / 1e6 if self.total else 0.0
+
+    def agregar(self, otro: "Histograma") -> None:
+        if otro.bits != self.bits:
+            raise ValueError("Histograma: no se pueden sumar histogramas con distinta precision")
+        for i, cuenta in otro.cuentas.items():
+            self.cuentas[i] = self.cuentas.get(i, 0) + cuenta
+        if otro.total and (not self.total or otro.minimo < self.minimo):
+            self.minimo = otro.minimo
+        self.maximo = max(self.maximo, otro.maximo)
+        self.total += otro.total
+        self.suma += otro.suma
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {"bits": self.bits, "total": self.total, "suma_us": self.suma,
+                "min_us": self.minimo, "max_us": self.maximo,
+                "cubetas": [[i, c] for i, c in sorted(self.cuentas.items())]}
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> "Histograma":
+        h = cls(datos["bits"])
+        h.cuentas = {i: c for i, c in datos["cubetas"]}
+        h.total = datos["total"]
+        h.suma = datos["suma_us"]
+        h.minimo = datos["min_us"]
+        h.maximo = datos["max_us"]
+        return h
+
+
+def percentiles(h: Histograma, ps: List[float]) -> Dict[str, float]:
+    """{"p50": segundos, ...} para los percentiles pedidos."""
+    return {f"p{p:g}": h.percentil(p) for p in ps}
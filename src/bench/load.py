@@ -0,0 +1,302 @@
+"""Generador de carga contra un servidor XML-RPC.
+
+Dos modos:
+  cerrado  --concurrencia N usuarios que mandan un llamado apenas reciben la
+           respuesta anterior (mide el throughput maximo con N en vuelo)
+  abierto  --tasa R llamados por segundo a intervalos fijos, respondan o no
+           (mide la latencia a una carga dada; la latencia se cuenta desde el
+           instante programado, asi las demoras del servidor no se esconden)
+
+La mezcla de llamados se arma con --llamado 'metodo(args)@peso' (repetible;
+los args son literales de Python) o con --mezcla archivo.json
+([{"metodo": "suma", "params": [1, 2], "peso": 3}, ...]). Los primeros
+--calentamiento segundos no se miden. Reporta latencias HDR (p50/p90/p99/p99.9)
+total y por metodo, throughput y errores por faultCode.
+
+    python -m bench load --puerto 8000 --llamado 'suma(7, 5)@9' --llamado 'slow_method(1)'
+    python -m bench load --modo abierto --tasa 500 --duracion 30 --llamado 'suma(1, 2)' --json r.json
+"""
+import argparse
+import ast
+import asyncio
+import json
+import math
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from async_client import connect_async, AsyncClient
+from client import ErrorRPC
+from xmlrpc_redes import ErrorHTTP
+from bench.histograma import Histograma, percentiles
+
+PERCENTILES = [50, 90, 99, 99.9]
+_LLAMADO = re.compile(r"^\s*([\w.]+)\s*\((.*)\)\s*(?:@\s*([0-9.]+))?\s*$", re.S)
+
+
+class Llamado:
+    """Un llamado de la mezcla. Con xml se envia ese <methodCall> tal cual
+    (llamados capturados) en lugar de armarlo con metodo y params."""
+
+    def __init__(self, metodo: str, params: List[Any], peso: float = 1.0, xml: Optional[bytes] = None):
+        if peso <= 0:
+            raise ValueError(f"peso invalido para {metodo}: {peso}")
+        self.metodo = metodo
+        self.params = params
+        self.peso = peso
+        self.xml = xml
+
+
+def parsear_llamado(texto: str) -> Llamado:
+    """'suma(7, 5)@3' -> Llamado("suma", [7, 5], 3.0)."""
+    m = _LLAMADO.match(texto)
+    if m is None:
+        raise ValueError(f"llamado invalido: {texto!r} (se espera metodo(args)@peso)")
+    try:
+        params = list(ast.literal_eval(f"[{m.group(2)}]"))
+    except (ValueError, SyntaxError) as e:
+        raise ValueError(f"argumentos invalidos en {texto!r}: {e}")
+    return Llamado(m.group(1), params, float(m.group(3) or 1))
+
+
+def leer_mezcla(archivo: str) -> List[Llamado]:
+    with open(archivo, encoding="utf-8") as f:
+        datos = json.load(f)
+    return [Llamado(d["metodo"], list(d.get("params", [])), float(d.get("peso", 1))) for d in datos]
+
+
+def clasificar_error(e: BaseException) -> str:
+    """Clave con la que se cuenta un error: 'fault <codigo>', 'timeout', etc."""
+    if isinstance(e, ErrorRPC):
+        return f"fault {e.codigo}"
+    if isinstance(e, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(e, ErrorHTTP):
+        return "http"
+    if isinstance(e, (ConnectionError, OSError)):
+        return "conexion"
+    return f"otro ({type(e).__name__})"
+
+
+class Resultados:
+    """Latencias y errores de la parte medida de la corrida."""
+
+    def __init__(self):
+        self.total = Histograma()
+        self.por_metodo: Dict[str, Histograma] = {}
+        self.errores: Dict[str, int] = {}
+        self.mensajes: Dict[str, str] = {}
+
+    def ok(self, metodo: str, segundos: float) -> None:
+        self.total.registrar(segundos)
+        h = self.por_metodo.get(metodo)
+        if h is None:
+            h = self.por_metodo[metodo] = Histograma()
+        h.registrar(segundos)
+
+    def error(self, e: BaseException) -> None:
+        clave = clasificar_error(e)
+        self.errores[clave] = self.errores.get(clave, 0) + 1
+        # Un mensaje de ejemplo por clave
+        self.mensajes.setdefault(clave, str(e) or type(e).__name__)
+
+    @property
+    def cantidad_errores(self) -> int:
+        return sum(self.errores.values())
+
+
+class GeneradorCarga:
+    def __init__(self, conn: AsyncClient, llamados: List[Llamado], semilla: Optional[int] = None):
+        self.conn = conn
+        self.llamados = llamados
+        self.pesos = [ll.peso for ll in llamados]
+        self.rnd = random.Random(semilla)
+        self.resultados = Resultados()
+        self.medir_desde = 0.0
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+
+    def elegir(self) -> Llamado:
+        return self.rnd.choices(self.llamados, self.pesos)[0]
+
+    async def llamar(self, llamado: Llamado, inicio: float) -> None:
+        """Hace un llamado y lo registra si inicio (instante programado o de
+        envio) cae despues del calentamiento."""
+        self.en_vuelo += 1
+        self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+        try:
+            if llamado.xml is not None:
+                await self.conn.llamar_xml(llamado.xml)
+            else:
+                await getattr(self.conn, llamado.metodo)(*llamado.params)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if inicio >= self.medir_desde:
+                self.resultados.error(e)
+        else:
+            if inicio >= self.medir_desde:
+                self.resultados.ok(llamado.metodo, time.perf_counter() - inicio)
+        finally:
+            self.en_vuelo -= 1
+
+    async def cerrado(self, concurrencia: int, calentamiento: float, duracion: float) -> None:
+        self.medir_desde = time.perf_counter() + calentamiento
+        fin = self.medir_desde + duracion
+
+        async def usuario():
+            while True:
+                inicio = time.perf_counter()
+                if inicio >= fin:
+                    return
+                await self.llamar(self.elegir(), inicio)
+
+        await asyncio.gather(*[usuario() for _ in range(concurrencia)])
+
+    async def abierto(self, tasa: float, calentamiento: float, duracion: float) -> None:
+        intervalo = 1 / tasa
+        n = int(math.ceil((calentamiento + duracion) * tasa))
+        await self.programado(((i * intervalo, self.elegir()) for i in range(n)), calentamiento)
+
+    async def programado(self, plan: Iterable[Tuple[float, Llamado]], calentamiento: float = 0.0) -> None:
+        """Manda cada llamado del plan a los segundos indicados desde el comienzo
+        (en orden creciente), sin esperar las respuestas anteriores."""
+        comienzo = time.perf_counter()
+        self.medir_desde = comienzo + calentamiento
+        tareas = set()
+        for desfase, llamado in plan:
+            programado = comienzo + desfase
+            espera = programado - time.perf_counter()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            # Si el generador se atraso, los llamados atrasados salen ya pero
+            # su latencia se sigue midiendo desde el instante programado
+            tarea = asyncio.ensure_future(self.llamar(llamado, programado))
+            tareas.add(tarea)
+            tarea.add_done_callback(tareas.discard)
+        if tareas:
+            await asyncio.gather(*tareas)
+
+
+def _ms(segundos: float) -> str:
+    return f"{segundos * 1e3:.2f}"
+
+
+def informe(args: argparse.Namespace, gen: GeneradorCarga, segundos: float) -> Dict[str, Any]:
+    return dict({
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "servidor": f"{args.host}:{args.puerto}",
+        "modo": args.modo,
+        "concurrencia": args.concurrencia,
+        "tasa": args.tasa if args.modo == "abierto" else None,
+        "calentamiento": args.calentamiento,
+        "duracion": segundos,
+        "mezcla": [{"metodo": ll.metodo, "params": ll.params, "peso": ll.peso} for ll in gen.llamados],
+    }, **resumen(gen, segundos))
+
+
+def resumen(gen: GeneradorCarga, segundos: float) -> Dict[str, Any]:
+    """Lo medido: cantidades, throughput, latencias y errores."""
+    r = gen.resultados
+    return {
+        "ok": r.total.total,
+        "errores": r.errores,
+        "mensajes_error": r.mensajes,
+        "throughput": r.total.total / segundos if segundos else 0.0,
+        "max_en_vuelo": gen.max_en_vuelo,
+        "latencia": dict(percentiles(r.total, PERCENTILES), min=r.total.minimo / 1e6,
+                         media=r.total.media, max=r.total.maximo / 1e6),
+        "por_metodo": {m: dict(percentiles(h, PERCENTILES), total=h.total)
+                       for m, h in sorted(r.por_metodo.items())},
+        "histograma": r.total.como_dict(),
+    }
+
+
+def imprimir(datos: Dict[str, Any], salida) -> None:
+    modo = (f"abierto, {datos['tasa']:g} llamados/s" if datos["modo"] == "abierto"
+            else f"cerrado, {datos['concurrencia']} en vuelo")
+    print(f"{datos['servidor']} - {modo}, {datos['duracion']:.1f} s medidos "
+          f"(+{datos['calentamiento']:g} s de calentamiento)", file=salida)
+    imprimir_resumen(datos, salida)
+
+
+def imprimir_resumen(datos: Dict[str, Any], salida) -> None:
+    errores = sum(datos["errores"].values())
+    print(f"llamados: {datos['ok']} ok, {errores} con error, {datos['throughput']:.1f} ok/s, "
+          f"max en vuelo {datos['max_en_vuelo']}", file=salida)
+    lat = datos["latencia"]
+    columnas = ["min"] + [f"p{p:g}" for p in PERCENTILES] + ["max"]
+    print("latencia ms: " + "  ".join(f"{c} {_ms(lat[c])}" for c in columnas), file=salida)
+    if len(datos["por_metodo"]) > 1:
+        print(f"{'metodo':<24} {'ok':>8} " + " ".join(f"{c:>9}" for c in columnas[1:-1]), file=salida)
+        for metodo, m in datos["por_metodo"].items():
+            print(f"{metodo:<24} {m['total']:>8} " + " ".join(f"{_ms(m[c]):>9}" for c in columnas[1:-1]),
+                  file=salida)
+    if errores:
+        print("errores:", file=salida)
+        for clave, cuenta in sorted(datos["errores"].items(), key=lambda x: -x[1]):
+            print(f"  {clave:<20} {cuenta:>8}  {datos['mensajes_error'][clave]}", file=salida)
+
+
+async def _correr(args: argparse.Namespace, llamados: List[Llamado]) -> Tuple[GeneradorCarga, float]:
+    async with connect_async(args.host, args.puerto, args.timeout, args.concurrencia,
+                             compresion=args.compresion) as conn:
+        gen = GeneradorCarga(conn, llamados, args.semilla)
+        t0 = time.perf_counter()
+        if args.modo == "cerrado":
+            await gen.cerrado(args.concurrencia, args.calentamiento, args.duracion)
+        else:
+            await gen.abierto(args.tasa, args.calentamiento, args.duracion)
+        # En modo abierto los ultimos llamados pueden terminar despues del fin
+        segundos = max(time.perf_counter() - t0 - args.calentamiento, args.duracion)
+    return gen, segundos
+
+
+def ejecutar(args: argparse.Namespace) -> int:
+    try:
+        llamados = [parsear_llamado(t) for t in args.llamado or []]
+        if args.mezcla:
+            llamados += leer_mezcla(args.mezcla)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"python -m bench load: {e}", file=sys.stderr)
+        return 2
+    if not llamados:
+        print("python -m bench load: falta al menos un --llamado o --mezcla", file=sys.stderr)
+        return 2
+    if args.modo == "abierto" and not args.tasa:
+        print("python -m bench load: el modo abierto necesita --tasa", file=sys.stderr)
+        return 2
+    gen, segundos = asyncio.run(_correr(args, llamados))
+    datos = informe(args, gen, segundos)
+    imprimir(datos, sys.stderr if args.json == "-" else sys.stdout)
+    if args.json == "-":
+        json.dump(datos, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=2)
+    return 1 if gen.resultados.cantidad_errores and args.fallar_con_errores else 0
+
+
+def configurar(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--modo", choices=["cerrado", "abierto"], default="cerrado")
+    parser.add_argument("--concurrencia", type=int, default=16,
+                        help="llamados en vuelo (modo cerrado) o conexiones maximas (abierto)")
+    parser.add_argument("--tasa", type=float, help="llamados por segundo (modo abierto)")
+    parser.add_argument("--duracion", type=float, default=10.0, help="segundos medidos")
+    parser.add_argument("--calentamiento", type=float, default=2.0, help="segundos iniciales sin medir")
+    parser.add_argument("--llamado", action="append", metavar="'METODO(ARGS)@PESO'",
+                        help="llamado de la mezcla, repetible (ej. 'suma(7, 5)@3')")
+    parser.add_argument("--mezcla", metavar="ARCHIVO", help="mezcla de llamados en JSON")
+    parser.add_argument("--timeout", type=float, default=20.0, help="timeout de cada llamado")
+    parser.add_argument("--compresion", action="store_true", help="pide respuestas comprimidas")
+    parser.add_argument("--semilla", type=int, help="semilla para elegir los llamados de la mezcla")
+    parser.add_argument("--json", metavar="ARCHIVO", help="guarda el informe en JSON ('-' para stdout)")
+    parser.add_argument("--fallar-con-errores", action="store_true",
+                        help="sale con codigo 1 si hubo errores")
+    parser.set_defaults(ejecutar=ejecutar)
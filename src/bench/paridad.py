@@ -0,0 +1,220 @@
+"""Comparacion con xmlrpc.client y xmlrpc.server de la biblioteca estandar.
+
+Manda cada carga de `bench codec` (con los metodos de bench/eco.py) por las
+cuatro combinaciones de cliente y servidor:
+  redes/redes    Client contra Server
+  stdlib/stdlib  xmlrpc.client.ServerProxy contra SimpleXMLRPCServer
+  stdlib/redes   ServerProxy contra Server
+  redes/stdlib   Client contra SimpleXMLRPCServer
+Verifica que el resultado sea igual a lo enviado (tipos incluidos; un fault debe
+ser el mismo para los dos clientes de un servidor) y reporta llamados por
+segundo de un cliente secuencial, latencias p50/p99, el pico de memoria del
+cliente en un llamado (tracemalloc), el del servidor (RSS por encima del
+arranque; cada carga usa servidores nuevos) y la relacion de throughput contra
+stdlib/stdlib. Los dos servidores usan un hilo por conexion y keep-alive y,
+salvo --compresion, no comprimen. Sale con codigo 1 si algun resultado difiere.
+Con la biblioteca estandar las cargas de un millon de numeros tardan minutos.
+
+    python -m bench paridad
+    python -m bench paridad --cargas escalares,struct_profundo --tiempo 3 --json paridad.json
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import xmlrpc.client
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from client import connect, ErrorRPC, cerrar_conexiones
+from bench.codec import CARGAS, pico_memoria, _lista, _cantidad
+from bench.histograma import Histograma
+from bench.servidor import iniciar_servidor
+
+HOST = "127.0.0.1"
+PILAS = ["redes", "stdlib"]
+# (cliente, servidor); la primera es la referencia de la columna "vs stdlib"
+COMBINACIONES = [("stdlib", "stdlib"), ("redes", "redes"), ("stdlib", "redes"), ("redes", "stdlib")]
+
+
+def conectar(pila: str, puerto: int, args: argparse.Namespace) -> Any:
+    if pila == "redes":
+        return connect(HOST, puerto, args.timeout, compresion=args.compresion)
+    # El cliente de la biblioteca estandar siempre acepta respuestas gzip
+    return xmlrpc.client.ServerProxy(f"http://{HOST}:{puerto}/RPC2", use_builtin_types=True)
+
+
+def llamado_de(carga: str) -> Tuple[str, List[Any]]:
+    params = CARGAS[carga]()
+    if carga == "fault":
+        return "fallar", [params[0]["faultString"]]
+    return "eco", params
+
+
+def llamar(conn: Any, metodo: str, params: List[Any]) -> Any:
+    """El resultado, o ("fault", codigo, mensaje) si el servidor respondio un fault."""
+    try:
+        return getattr(conn, metodo)(*params)
+    except ErrorRPC as e:
+        return ("fault", e.codigo, e.mensaje)
+    except xmlrpc.client.Fault as e:
+        return ("fault", e.faultCode, e.faultString)
+
+
+def diferencia(obtenido: Any, esperado: Any, ruta: str = "resultado") -> Optional[str]:
+    """Descripcion de la primera diferencia (de valor o de tipo), o None."""
+    if type(obtenido) is not type(esperado):
+        return f"{ruta}: {type(obtenido).__name__} en lugar de {type(esperado).__name__}"
+    if isinstance(esperado, dict):
+        if obtenido.keys() != esperado.keys():
+            return f"{ruta}: claves {sorted(obtenido)} en lugar de {sorted(esperado)}"
+        for clave in esperado:
+            d = diferencia(obtenido[clave], esperado[clave], f"{ruta}[{clave!r}]")
+            if d:
+                return d
+        return None
+    if isinstance(esperado, (list, tuple)):
+        if len(obtenido) != len(esperado):
+            return f"{ruta}: largo {len(obtenido)} en lugar de {len(esperado)}"
+        for i, (o, e) in enumerate(zip(obtenido, esperado)):
+            d = diferencia(o, e, f"{ruta}[{i}]")
+            if d:
+                return d
+        return None
+    if obtenido != esperado:
+        return f"{ruta}: {obtenido!r:.60} en lugar de {esperado!r:.60}"
+    return None
+
+
+def medir(conn: Any, metodo: str, params: List[Any], tiempo: float, min_llamados: int) -> Tuple[Histograma, float]:
+    """Llamados secuenciales durante al menos tiempo segundos y min_llamados llamados."""
+    h = Histograma()
+    t0 = time.perf_counter()
+    while True:
+        inicio = time.perf_counter()
+        llamar(conn, metodo, params)
+        fin = time.perf_counter()
+        h.registrar(fin - inicio)
+        if h.total >= min_llamados and fin - t0 >= tiempo:
+            return h, fin - t0
+
+
+def memoria_servidor(puerto: int) -> int:
+    """Pico de RSS del servidor en bytes."""
+    return xmlrpc.client.ServerProxy(f"http://{HOST}:{puerto}/RPC2").memoria_pico_kb() * 1024
+
+
+def comparar_carga(carga: str, args: argparse.Namespace, informar) -> List[Dict[str, Any]]:
+    metodo, params = llamado_de(carga)
+    esperado = None if metodo == "fallar" else (params[0] if len(params) == 1 else params)
+    opciones = [] if args.compresion else ["--sin-compresion"]
+    resultados = []
+    with iniciar_servidor(["bench.eco"], args.asincrono, opciones) as puerto_redes, \
+            iniciar_servidor(["bench.eco"], argumentos=opciones + ["--stdlib"]) as puerto_stdlib:
+        puertos = {"redes": puerto_redes, "stdlib": puerto_stdlib}
+        base = {pila: memoria_servidor(puertos[pila]) for pila in PILAS}
+        faults: Dict[str, Any] = {}
+        for pila_cliente, pila_servidor in COMBINACIONES:
+            conn = conectar(pila_cliente, puertos[pila_servidor], args)
+            # El primer llamado (que abre la conexion) se usa para verificar
+            obtenido = llamar(conn, metodo, params)
+            if esperado is not None:
+                dif = diferencia(obtenido, esperado)
+            elif not (isinstance(obtenido, tuple) and obtenido[0] == "fault"):
+                dif = f"se esperaba un fault y llego {obtenido!r:.60}"
+            else:
+                # Cada servidor arma su propio fault; los dos clientes deben leer lo mismo
+                dif = diferencia(obtenido, faults.setdefault(pila_servidor, obtenido), "fault")
+            h, segundos = medir(conn, metodo, params, args.tiempo, args.min_llamados)
+            resultados.append({
+                "carga": carga,
+                "cliente": pila_cliente,
+                "servidor": pila_servidor,
+                "igual": dif is None,
+                "diferencia": dif,
+                "llamados": h.total,
+                "llamados_seg": h.total / segundos,
+                "p50": h.percentil(50),
+                "p99": h.percentil(99),
+                "pico_cliente": pico_memoria(lambda _: llamar(conn, metodo, params), None),
+            })
+            if pila_cliente == "redes":
+                cerrar_conexiones()
+        pico = {pila: memoria_servidor(puertos[pila]) - base[pila] for pila in PILAS}
+    referencia = resultados[0]["llamados_seg"]
+    for r in resultados:
+        r["pico_servidor"] = pico[r["servidor"]]
+        r["vs_stdlib"] = r["llamados_seg"] / referencia
+        informar(r)
+    return resultados
+
+
+def _fila(r: Dict[str, Any]) -> str:
+    combinacion = f"{r['cliente']}/{r['servidor']}"
+    return (f"{r['carga']:<16} {combinacion:<14} {'si' if r['igual'] else 'NO':>5} "
+            f"{r['llamados_seg']:>10.2f} {r['p50'] * 1e3:>9.2f} {r['p99'] * 1e3:>9.2f} "
+            f"{_cantidad(r['pico_cliente']) + 'B':>9} {_cantidad(r['pico_servidor']) + 'B':>9} "
+            f"{r['vs_stdlib']:>8.2f}x")
+
+
+def resumen(resultados: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Media geometrica de la relacion de throughput de cada combinacion."""
+    relaciones: Dict[str, List[float]] = {}
+    for r in resultados:
+        relaciones.setdefault(f"{r['cliente']}/{r['servidor']}", []).append(r["vs_stdlib"])
+    return {c: math.exp(sum(map(math.log, rs)) / len(rs)) for c, rs in relaciones.items()}
+
+
+def ejecutar(args: argparse.Namespace) -> int:
+    salida = sys.stderr if args.json == "-" else sys.stdout
+    servidor = "AsyncServer" if args.asincrono else "Server"
+    print(f"redes = Client y {servidor}; stdlib = xmlrpc.client.ServerProxy y SimpleXMLRPCServer "
+          f"({'con' if args.compresion else 'sin'} compresion)", file=salida)
+    print(f"{'carga':<16} {'cliente/serv.':<14} {'igual':>5} {'llamados/s':>10} {'p50 ms':>9} "
+          f"{'p99 ms':>9} {'pico cli':>9} {'pico srv':>9} {'vs stdlib':>9}", file=salida)
+
+    def informar(r: Dict[str, Any]) -> None:
+        print(_fila(r), file=salida, flush=True)
+
+    resultados = []
+    for carga in args.cargas:
+        resultados += comparar_carga(carga, args, informar)
+    relaciones = resumen(resultados)
+    print("throughput vs stdlib/stdlib (media geometrica): "
+          + ", ".join(f"{c} {x:.2f}x" for c, x in relaciones.items()), file=salida)
+    distintos = [r for r in resultados if not r["igual"]]
+    for r in distintos:
+        print(f"DIFERENCIA {r['carga']} {r['cliente']}/{r['servidor']}: {r['diferencia']}", file=salida)
+    if args.json:
+        informe = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "servidor": servidor,
+            "compresion": args.compresion,
+            "tiempo": args.tiempo,
+            "min_llamados": args.min_llamados,
+            "relaciones": relaciones,
+            "resultados": resultados,
+        }
+        if args.json == "-":
+            json.dump(informe, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(informe, f, indent=2)
+    return 1 if distintos else 0
+
+
+def configurar(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--cargas", type=_lista(list(CARGAS)), default=list(CARGAS),
+                        help=f"separadas por coma (por defecto todas: {', '.join(CARGAS)})")
+    parser.add_argument("--tiempo", type=float, default=1.0, help="segundos minimos por combinacion")
+    parser.add_argument("--min-llamados", type=int, default=3, help="llamados minimos por combinacion")
+    parser.add_argument("--compresion", action="store_true",
+                        help="servidores y Client con compresion gzip (ServerProxy siempre la acepta)")
+    parser.add_argument("--asincrono", action="store_true", help="compara AsyncServer en lugar de Server")
+    parser.add_argument("--timeout", type=float, default=120.0, help="timeout de cada llamado de Client")
+    parser.add_argument("--json", metavar="ARCHIVO", help="guarda los resultados en JSON ('-' para stdout)")
+    parser.set_defaults(ejecutar=ejecutar)
@@ -0,0 +1,233 @@
+"""Lectura de capturas pcap y reensamblado de flujos TCP, en Python puro.
+
+Soporta pcap clasico (micro o nanosegundos, cualquier endianness) con enlaces
+Ethernet (con VLAN), Linux cooked (SLL y SLL2), IP crudo y loopback BSD, sobre
+IPv4 o IPv6. No soporta pcapng ni IP fragmentado.
+"""
+import bisect
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from xmlrpc_redes import LectorHTTP, ErrorHTTP, descomprimir
+
+_MAGICOS = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+_PCAPNG = b"\x0a\x0d\x0d\x0a"
+
+ENLACE_NULL = 0
+ENLACE_ETHERNET = 1
+ENLACE_RAW = 101
+ENLACE_SLL = 113
+ENLACE_IPV4 = 228
+ENLACE_IPV6 = 229
+ENLACE_SLL2 = 276
+
+_SYN = 0x02
+
+Extremo = Tuple[str, int]
+
+
+def leer_pcap(archivo: str) -> Iterator[Tuple[float, int, bytes]]:
+    """(timestamp, tipo de enlace, trama) de cada paquete de la captura."""
+    with open(archivo, "rb") as f:
+        datos = f.read()
+    magico = datos[:4]
+    if magico == _PCAPNG:
+        raise ValueError(f"{archivo}: pcapng no soportado (convertir con editcap -F pcap)")
+    if magico not in _MAGICOS or len(datos) < 24:
+        raise ValueError(f"{archivo}: no es una captura pcap")
+    orden, unidad = _MAGICOS[magico]
+    enlace = struct.unpack(orden + "I", datos[20:24])[0] & 0x0FFFFFFF
+    registro = struct.Struct(orden + "IIII")
+    pos = 24
+    while pos + 16 <= len(datos):
+        seg, frac, incluido, _ = registro.unpack_from(datos, pos)
+        pos += 16
+        yield seg + frac * unidad, enlace, datos[pos:pos + incluido]
+        pos += incluido
+
+
+def _ip(enlace: int, trama: bytes) -> Optional[bytes]:
+    """El paquete IP dentro de la trama (None si no es IP)."""
+    if enlace == ENLACE_ETHERNET:
+        if len(trama) < 14:
+            return None
+        tipo, pos = struct.unpack("!H", trama[12:14])[0], 14
+        while tipo in (0x8100, 0x88A8) and len(trama) >= pos + 4:
+            tipo, pos = struct.unpack("!H", trama[pos + 2:pos + 4])[0], pos + 4
+        return trama[pos:] if tipo in (0x0800, 0x86DD) else None
+    if enlace == ENLACE_SLL:
+        return trama[16:] if trama[14:16] in (b"\x08\x00", b"\x86\xdd") else None
+    if enlace == ENLACE_SLL2:
+        return trama[20:] if trama[0:2] in (b"\x08\x00", b"\x86\xdd") else None
+    if enlace == ENLACE_NULL:
+        return trama[4:]
+    if enlace in (ENLACE_RAW, ENLACE_IPV4, ENLACE_IPV6, 12, 14):
+        return trama
+    return None
+
+
+def _direccion(crudo: bytes) -> str:
+    if len(crudo) == 4:
+        return ".".join(map(str, crudo))
+    grupos = struct.unpack("!8H", crudo)
+    return ":".join(f"{g:x}" for g in grupos)
+
+
+class SegmentoTCP:
+    __slots__ = ("ts", "origen", "destino", "seq", "flags", "datos")
+
+    def __init__(self, ts: float, origen: Extremo, destino: Extremo, seq: int, flags: int, datos: bytes):
+        self.ts = ts
+        self.origen = origen
+        self.destino = destino
+        self.seq = seq
+        self.flags = flags
+        self.datos = datos
+
+
+def segmentos_tcp(archivo: str) -> Iterator[SegmentoTCP]:
+    for ts, enlace, trama in leer_pcap(archivo):
+        ip = _ip(enlace, trama)
+        if not ip:
+            continue
+        version = ip[0] >> 4
+        if version == 4 and len(ip) >= 20:
+            ihl = (ip[0] & 0x0F) * 4
+            largo, frag = struct.unpack("!H2xH", ip[2:8])
+            if ip[9] != 6 or frag & 0x3FFF:
+                continue
+            # Con TSO el largo total puede venir en 0
+            origen, destino, tcp = ip[12:16], ip[16:20], ip[ihl:largo or len(ip)]
+        elif version == 6 and len(ip) >= 40:
+            if ip[6] != 6:
+                continue
+            largo = struct.unpack("!H", ip[4:6])[0]
+            origen, destino, tcp = ip[8:24], ip[24:40], ip[40:40 + largo]
+        else:
+            continue
+        if len(tcp) < 20:
+            continue
+        sport, dport, seq = struct.unpack("!HHI", tcp[:8])
+        offset = (tcp[12] >> 4) * 4
+        yield SegmentoTCP(ts, (_direccion(origen), sport), (_direccion(destino), dport),
+                          seq, tcp[13], tcp[offset:])
+
+
+class FlujoTCP:
+    """Los bytes de un sentido de una conexion, en orden y sin retransmisiones.
+
+    tiempo(pos) devuelve el timestamp del paquete que trajo el byte pos;
+    completo es False si faltan segmentos (hueco o captura truncada).
+    """
+
+    def __init__(self, origen: Extremo, destino: Extremo, inicio: Optional[int]):
+        self.origen = origen
+        self.destino = destino
+        self.datos = b""
+        self.completo = True
+        self._inicio = inicio
+        self._segmentos: List[Tuple[int, float, bytes]] = []
+        self._posiciones: List[int] = []
+        self._tiempos: List[float] = []
+
+    def _agregar(self, seg: SegmentoTCP) -> None:
+        if seg.datos:
+            self._segmentos.append((seg.seq, seg.ts, seg.datos))
+
+    def _armar(self) -> None:
+        if not self._segmentos:
+            return
+        base = self._inicio if self._inicio is not None else min(s[0] for s in self._segmentos)
+        ordenados = sorted(((seq - base) & 0xFFFFFFFF, ts, d) for seq, ts, d in self._segmentos)
+        datos = bytearray()
+        for pos, ts, d in ordenados:
+            if pos + len(d) <= len(datos):
+                continue  # retransmision
+            if pos > len(datos):
+                self.completo = False
+                break
+            self._posiciones.append(len(datos))
+            self._tiempos.append(ts)
+            datos += d[len(datos) - pos:]
+        self.datos = bytes(datos)
+        self._segmentos = []
+
+    def tiempo(self, pos: int) -> float:
+        i = bisect.bisect_right(self._posiciones, pos) - 1
+        return self._tiempos[max(i, 0)]
+
+
+def flujos_tcp(archivo: str) -> List[FlujoTCP]:
+    """Reensambla cada sentido de cada conexion TCP de la captura, en el orden
+    en que aparecen. Un SYN sobre una cuadrupla ya vista abre un flujo nuevo."""
+    abiertos: Dict[Tuple[Extremo, Extremo], FlujoTCP] = {}
+    flujos: List[FlujoTCP] = []
+    for seg in segmentos_tcp(archivo):
+        clave = (seg.origen, seg.destino)
+        flujo = abiertos.get(clave)
+        if seg.flags & _SYN:
+            if flujo is None or flujo._segmentos:
+                flujo = abiertos[clave] = FlujoTCP(seg.origen, seg.destino, seg.seq + 1)
+                flujos.append(flujo)
+            continue
+        if flujo is None:
+            # Conexion que ya estaba abierta cuando empezo la captura
+            flujo = abiertos[clave] = FlujoTCP(seg.origen, seg.destino, None)
+            flujos.append(flujo)
+        flujo._agregar(seg)
+    for flujo in flujos:
+        flujo._armar()
+    return [f for f in flujos if f.datos]
+
+
+class LlamadoCapturado:
+    """Un llamado HTTP POST de la captura (cuerpo ya descomprimido)."""
+
+    def __init__(self, ts: float, flujo: FlujoTCP, llamado: str, encabezados: Dict[str, str], cuerpo: bytes):
+        self.ts = ts
+        self.flujo = flujo
+        self.llamado = llamado
+        self.encabezados = encabezados
+        self.cuerpo = cuerpo
+
+
+def llamados_http(archivo: str, puerto: Optional[int] = None) -> List[LlamadoCapturado]:
+    """Los POST HTTP de la captura (hacia puerto, si se indica) ordenados por
+    el instante en que empezaron a llegar. Los mensajes incompletos, o cuyo
+    cuerpo no se puede descomprimir, se descartan."""
+    llamados = []
+    for flujo in flujos_tcp(archivo):
+        if puerto is not None and flujo.destino[1] != puerto:
+            continue
+        if not flujo.datos.lstrip(b"\r\n").startswith(b"POST "):
+            continue
+        lector = LectorHTTP()
+        lector.alimentar(flujo.datos)
+        try:
+            while lector.pendientes:
+                inicio = len(flujo.datos) - lector.pendientes
+                if not lector.encabezado():
+                    break
+                cuerpo = bytearray()
+                pedazo = lector.cuerpo()
+                while pedazo:
+                    cuerpo += pedazo
+                    pedazo = lector.cuerpo()
+                if not lector.terminado:
+                    break
+                codificacion = lector.encabezados.get("content-encoding", "identity")
+                if codificacion.lower() != "identity":
+                    cuerpo = descomprimir(bytes(cuerpo), codificacion)
+                if lector.llamado.startswith("POST "):
+                    llamados.append(LlamadoCapturado(flujo.tiempo(inicio), flujo, lector.llamado,
+                                                     dict(lector.encabezados), bytes(cuerpo)))
+                lector.siguiente()
+        except (ErrorHTTP, ValueError):
+            continue
+    llamados.sort(key=lambda ll: ll.ts)
+    return llamados
@@ -0,0 +1,188 @@
+"""Reproduce el trafico XML-RPC de una captura pcap contra un servidor.
+
+Extrae los <methodCall> de los POST HTTP de la captura (por defecto
+captures/server1.pcap) y los vuelve a mandar tal cual, en el orden capturado:
+  original  respeta los intervalos de la captura (divididos por --velocidad);
+            la latencia se cuenta desde el instante programado
+  maximo    lo mas rapido posible, con --concurrencia llamados en vuelo
+Sin --puerto levanta un servidor local (bench.servidor) con los metodos de
+examples/. Reporta throughput, latencias HDR y errores como `bench load`; los
+faults que ya estaban en la captura (divide por cero, metodo inexistente)
+aparecen como errores.
+
+    python -m bench replay
+    python -m bench replay --ritmo maximo --repeticiones 50 --excluir slow_method
+    python -m bench replay --captura ../captures/vhost1.pcap --velocidad 4 --json r.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from async_client import connect_async
+from xmlrpc_redes import parsear_llamado_xml
+from bench.load import Llamado, GeneradorCarga, resumen, imprimir_resumen
+from bench.pcap import llamados_http
+from bench.servidor import iniciar_servidor
+
+CAPTURA = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                       "captures", "server1.pcap")
+
+
+def leer_captura(archivo: str, puerto: Optional[int] = None) -> List[Tuple[float, Llamado]]:
+    """(segundos desde el primer llamado, llamado) de cada POST de la captura."""
+    capturados = llamados_http(archivo, puerto)
+    resultado = []
+    for capturado in capturados:
+        try:
+            metodo, params = parsear_llamado_xml(capturado.cuerpo)
+        except Exception:
+            # Se reenvia igual: el servidor decidira que responder
+            metodo, params = "?", []
+        resultado.append((capturado.ts - capturados[0].ts,
+                          Llamado(metodo, params, xml=capturado.cuerpo)))
+    return resultado
+
+
+def filtrar(llamados: List[Tuple[float, Llamado]], metodos: List[str],
+            excluir: List[str]) -> List[Tuple[float, Llamado]]:
+    return [(t, ll) for t, ll in llamados
+            if (not metodos or ll.metodo in metodos) and ll.metodo not in excluir]
+
+
+def plan_original(llamados: List[Tuple[float, Llamado]], velocidad: float,
+                  repeticiones: int) -> Iterator[Tuple[float, Llamado]]:
+    """Los llamados en sus instantes originales. Cada repeticion empieza un
+    intervalo medio despues del ultimo llamado de la anterior."""
+    inicio = llamados[0][0]
+    duracion = llamados[-1][0] - inicio
+    periodo = duracion * len(llamados) / (len(llamados) - 1) if len(llamados) > 1 else 0.0
+    for i in range(repeticiones):
+        for t, llamado in llamados:
+            yield (i * periodo + t - inicio) / velocidad, llamado
+
+
+async def maximo(gen: GeneradorCarga, llamados: List[Llamado], concurrencia: int,
+                 calentamiento: float) -> None:
+    gen.medir_desde = time.perf_counter() + calentamiento
+    pendientes = iter(llamados)
+
+    async def usuario():
+        # Todos los usuarios consumen del mismo iterador, en orden
+        for llamado in pendientes:
+            await gen.llamar(llamado, time.perf_counter())
+
+    await asyncio.gather(*[usuario() for _ in range(concurrencia)])
+
+
+async def _correr(args: argparse.Namespace, puerto: int,
+                  llamados: List[Tuple[float, Llamado]]) -> Tuple[GeneradorCarga, float]:
+    async with connect_async(args.host, puerto, args.timeout, args.concurrencia,
+                             compresion=args.compresion) as conn:
+        gen = GeneradorCarga(conn, [ll for _, ll in llamados])
+        t0 = time.perf_counter()
+        if args.ritmo == "original":
+            await gen.programado(plan_original(llamados, args.velocidad, args.repeticiones),
+                                 args.calentamiento)
+        else:
+            await maximo(gen, gen.llamados * args.repeticiones, args.concurrencia, args.calentamiento)
+        segundos = max(time.perf_counter() - t0 - args.calentamiento, 1e-9)
+    return gen, segundos
+
+
+def mezcla(llamados: List[Tuple[float, Llamado]]) -> Dict[str, int]:
+    cuentas: Dict[str, int] = {}
+    for _, ll in llamados:
+        cuentas[ll.metodo] = cuentas.get(ll.metodo, 0) + 1
+    return dict(sorted(cuentas.items(), key=lambda x: -x[1]))
+
+
+def informe(args: argparse.Namespace, servidor: str, llamados: List[Tuple[float, Llamado]],
+            gen: GeneradorCarga, segundos: float) -> Dict[str, Any]:
+    return dict({
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "captura": args.captura,
+        "servidor": servidor,
+        "ritmo": args.ritmo,
+        "velocidad": args.velocidad if args.ritmo == "original" else None,
+        "concurrencia": args.concurrencia if args.ritmo == "maximo" else None,
+        "repeticiones": args.repeticiones,
+        "calentamiento": args.calentamiento,
+        "duracion": segundos,
+        "llamados_captura": len(llamados),
+        "duracion_captura": llamados[-1][0] - llamados[0][0],
+        "mezcla": mezcla(llamados),
+    }, **resumen(gen, segundos))
+
+
+def imprimir(datos: Dict[str, Any], salida) -> None:
+    metodos = ", ".join(f"{m} {n}" for m, n in datos["mezcla"].items())
+    print(f"{datos['captura']}: {datos['llamados_captura']} llamados en "
+          f"{datos['duracion_captura']:.1f} s ({metodos})", file=salida)
+    ritmo = (f"ritmo original x{datos['velocidad']:g}" if datos["ritmo"] == "original"
+             else f"ritmo maximo, {datos['concurrencia']} en vuelo")
+    print(f"{datos['servidor']} - {ritmo}, {datos['repeticiones']} repeticiones, "
+          f"{datos['duracion']:.1f} s medidos (+{datos['calentamiento']:g} s de calentamiento)", file=salida)
+    imprimir_resumen(datos, salida)
+
+
+def ejecutar(args: argparse.Namespace) -> int:
+    try:
+        llamados = leer_captura(args.captura, args.puerto_captura)
+    except (OSError, ValueError) as e:
+        print(f"python -m bench replay: {e}", file=sys.stderr)
+        return 2
+    llamados = filtrar(llamados, args.metodos, args.excluir)
+    if not llamados:
+        print(f"python -m bench replay: no hay llamados XML-RPC para reproducir en {args.captura}",
+              file=sys.stderr)
+        return 2
+    if args.puerto is not None:
+        gen, segundos = asyncio.run(_correr(args, args.puerto, llamados))
+        servidor = f"{args.host}:{args.puerto}"
+    else:
+        args.host = "127.0.0.1"
+        with iniciar_servidor(args.modulo, args.asincrono) as puerto:
+            gen, segundos = asyncio.run(_correr(args, puerto, llamados))
+        servidor = "local (AsyncServer)" if args.asincrono else "local (Server)"
+    datos = informe(args, servidor, llamados, gen, segundos)
+    imprimir(datos, sys.stderr if args.json == "-" else sys.stdout)
+    if args.json == "-":
+        json.dump(datos, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=2)
+    return 0
+
+
+def _nombres(texto: str) -> List[str]:
+    return [n.strip() for n in texto.split(",") if n.strip()]
+
+
+def configurar(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--captura", default=CAPTURA, help="archivo pcap (por defecto captures/server1.pcap)")
+    parser.add_argument("--puerto-captura", type=int, help="solo los llamados a este puerto de la captura")
+    parser.add_argument("--ritmo", choices=["original", "maximo"], default="original")
+    parser.add_argument("--velocidad", type=float, default=1.0,
+                        help="factor de aceleracion del ritmo original (ej. 10)")
+    parser.add_argument("--repeticiones", type=int, default=1, help="veces que se reproduce la captura")
+    parser.add_argument("--concurrencia", type=int, default=16,
+                        help="llamados en vuelo (ritmo maximo) o conexiones maximas (original)")
+    parser.add_argument("--calentamiento", type=float, default=0.0, help="segundos iniciales sin medir")
+    parser.add_argument("--metodos", type=_nombres, default=[], help="solo estos metodos (separados por coma)")
+    parser.add_argument("--excluir", type=_nombres, default=[],
+                        help="metodos a descartar, separados por coma (ej. slow_method)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, help="servidor ya levantado (si no, se levanta uno local)")
+    parser.add_argument("--modulo", action="append",
+                        help="modulo con los metodos del servidor local (repetible; por defecto los de examples/)")
+    parser.add_argument("--asincrono", action="store_true", help="servidor local con AsyncServer")
+    parser.add_argument("--timeout", type=float, default=30.0, help="timeout de cada llamado")
+    parser.add_argument("--compresion", action="store_true", help="pide respuestas comprimidas")
+    parser.add_argument("--json", metavar="ARCHIVO", help="guarda el informe en JSON ('-' para stdout)")
+    parser.set_defaults(ejecutar=ejecutar)
@@ -0,0 +1,131 @@
+"""Servidor local para los benchmarks, en un proceso aparte.
+
+Registra todas las funciones definidas en los modulos indicados (por defecto
+las de examples/myServer.py y myServer2.py, que son las de las capturas) y
+atiende en 127.0.0.1. Se usa como contexto desde los otros comandos
+(iniciar_servidor) o directamente:
+
+    python -m bench.servidor --puerto 8000 --modulo examples.myServer --asincrono
+
+Con --stdlib atiende con xmlrpc.server.SimpleXMLRPCServer en su lugar (con
+hilos y keep-alive, para comparar en igualdad de condiciones).
+"""
+import argparse
+import contextlib
+import importlib
+import inspect
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Callable, Iterator, List, Optional
+
+MODULOS = ["examples.myServer", "examples.myServer2"]
+
+
+def metodos_de(nombre_modulo: str) -> List[Callable]:
+    """Las funciones publicas definidas en el modulo (no las importadas)."""
+    modulo = importlib.import_module(nombre_modulo)
+    return [f for nombre, f in inspect.getmembers(modulo, inspect.isfunction)
+            if f.__module__ == modulo.__name__ and not nombre.startswith("_")]
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_puerto(host: str, puerto: int, timeout: float = 10.0,
+                   proceso: Optional[subprocess.Popen] = None) -> None:
+    limite = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((host, puerto), timeout=0.5).close()
+            return
+        except OSError:
+            if proceso is not None and proceso.poll() is not None:
+                raise RuntimeError(f"El servidor local termino con codigo {proceso.returncode}")
+            if time.monotonic() > limite:
+                raise
+            time.sleep(0.05)
+
+
+@contextlib.contextmanager
+def iniciar_servidor(modulos: Optional[List[str]] = None, asincrono: bool = False,
+                     argumentos: Optional[List[str]] = None) -> Iterator[int]:
+    """Levanta `python -m bench.servidor` en un proceso aparte (asi no compite
+    por el GIL con el cliente que mide) y devuelve su puerto."""
+    puerto = puerto_libre()
+    comando = [sys.executable, "-m", "bench.servidor", "--puerto", str(puerto)]
+    for modulo in modulos or MODULOS:
+        comando += ["--modulo", modulo]
+    if asincrono:
+        comando.append("--asincrono")
+    comando += argumentos or []
+    src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proceso = subprocess.Popen(comando, cwd=src, stdout=subprocess.DEVNULL)
+    try:
+        esperar_puerto("127.0.0.1", puerto, proceso=proceso)
+        yield puerto
+    finally:
+        proceso.terminate()
+        try:
+            proceso.wait(5)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+            proceso.wait()
+
+
+def servidor_stdlib(puerto: int, compresion: bool):
+    """SimpleXMLRPCServer con un hilo por conexion y HTTP/1.1 (keep-alive),
+    como Server. Sin compresion no responde gzip aunque el cliente lo acepte."""
+    from socketserver import ThreadingMixIn
+    from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+
+    class Manejador(SimpleXMLRPCRequestHandler):
+        protocol_version = "HTTP/1.1"
+        encode_threshold = SimpleXMLRPCRequestHandler.encode_threshold if compresion else None
+
+    class ServidorStdlib(ThreadingMixIn, SimpleXMLRPCServer):
+        daemon_threads = True
+
+    servidor = ServidorStdlib(("127.0.0.1", puerto), Manejador, logRequests=False, use_builtin_types=True)
+    servidor.register_multicall_functions()
+    return servidor
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.servidor", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--modulo", action="append", help="modulo con los metodos (repetible)")
+    parser.add_argument("--asincrono", action="store_true", help="usa AsyncServer en lugar de Server")
+    parser.add_argument("--max-hilos", type=int, help="hilos del Server (o workers del AsyncServer)")
+    parser.add_argument("--workers", type=int, default=1, help="procesos (pre-fork, ver Server.serve)")
+    parser.add_argument("--sin-compresion", action="store_true", help="nunca comprime las respuestas")
+    parser.add_argument("--stdlib", action="store_true", help="usa xmlrpc.server.SimpleXMLRPCServer")
+    args = parser.parse_args(argv)
+    funciones = [f for modulo in args.modulo or MODULOS for f in metodos_de(modulo)]
+    if args.stdlib:
+        servidor = servidor_stdlib(args.puerto, not args.sin_compresion)
+        for funcion in funciones:
+            servidor.register_function(funcion)
+        servidor.serve_forever()
+        return
+    if args.asincrono:
+        from async_server import AsyncServer
+        servidor = AsyncServer(("127.0.0.1", args.puerto), max_workers=args.max_hilos,
+                               compresion=not args.sin_compresion)
+    else:
+        from server import Server
+        opciones = {"max_hilos": args.max_hilos} if args.max_hilos else {}
+        servidor = Server(("127.0.0.1", args.puerto), compresion=not args.sin_compresion, **opciones)
+    for funcion in funciones:
+        servidor.add_method(funcion)
+    servidor.serve(args.workers)
+
+
+if __name__ == "__main__":
+    main()
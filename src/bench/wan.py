@@ -0,0 +1,182 @@
+"""Keep-alive, multicall y compresion a traves de un enlace WAN emulado.
+
+Levanta un servidor local (bench.servidor) con un ProxyWAN delante y, para cada
+perfil de enlace (proxy_wan.PERFILES o --rtt/--jitter/--mbps), mide con Client:
+  sin_keep_alive  --llamados llamados chicos, una conexion por llamado
+  keep_alive      los mismos llamados sobre una conexion persistente
+  multicall       los mismos llamados en un solo system.multicall
+  texto           echo_large_text de --kb KB de texto, sin compresion
+  texto_gzip      el mismo llamado con compresion=True
+Reporta la mediana de --rondas del tiempo total y por llamado, las conexiones
+abiertas y los bytes que cruzaron el enlace en cada sentido.
+
+    python -m bench wan
+    python -m bench wan --perfiles mininet --llamados 50
+    python -m bench wan --rtt 80 --jitter 5 --mbps 10 --json wan.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from client import connect, cerrar_conexiones
+from proxy_wan import ProxyWAN, Enlace, PERFILES
+from bench.codec import CARGAS, _lista
+from bench.servidor import iniciar_servidor
+
+HOST = "127.0.0.1"
+
+
+def _sin_keep_alive(puerto: int, args: argparse.Namespace) -> int:
+    conn = connect(HOST, puerto, args.timeout, keep_alive=False)
+    for i in range(args.llamados):
+        conn.suma(i, 1)
+    return args.llamados
+
+
+def _keep_alive(puerto: int, args: argparse.Namespace) -> int:
+    conn = connect(HOST, puerto, args.timeout)
+    for i in range(args.llamados):
+        conn.suma(i, 1)
+    return args.llamados
+
+
+def _multicall(puerto: int, args: argparse.Namespace) -> int:
+    conn = connect(HOST, puerto, args.timeout)
+    with conn.multicall() as mc:
+        for i in range(args.llamados):
+            mc.suma(i, 1)
+    return args.llamados
+
+
+def _texto(compresion: bool) -> Callable[[int, argparse.Namespace], int]:
+    def medir(puerto: int, args: argparse.Namespace) -> int:
+        conn = connect(HOST, puerto, args.timeout, compresion=compresion)
+        if conn.echo_large_text(args.texto) != args.texto:
+            raise RuntimeError("echo_large_text devolvio otro texto")
+        return 1
+    return medir
+
+
+ESCENARIOS: Dict[str, Callable[[int, argparse.Namespace], int]] = {
+    "sin_keep_alive": _sin_keep_alive,
+    "keep_alive": _keep_alive,
+    "multicall": _multicall,
+    "texto": _texto(False),
+    "texto_gzip": _texto(True),
+}
+
+
+def medir(proxy: ProxyWAN, escenario: str, args: argparse.Namespace) -> Dict[str, Any]:
+    tiempos = []
+    for _ in range(args.rondas):
+        # Cada ronda arranca sin conexiones abiertas (paga su handshake)
+        cerrar_conexiones()
+        proxy.reiniciar_contadores()
+        t0 = time.perf_counter()
+        llamados = ESCENARIOS[escenario](proxy.puerto, args)
+        tiempos.append(time.perf_counter() - t0)
+    segundos = statistics.median(tiempos)
+    return {
+        "escenario": escenario,
+        "llamados": llamados,
+        "segundos": segundos,
+        "por_llamado": segundos / llamados,
+        "min": min(tiempos),
+        "max": max(tiempos),
+        # Los contadores son de la ultima ronda
+        "conexiones": proxy.conexiones,
+        "bytes_subida": proxy.bytes_subida,
+        "bytes_bajada": proxy.bytes_bajada,
+    }
+
+
+def _cantidad(x: float) -> str:
+    for limite, sufijo in ((1e6, "M"), (1e3, "k")):
+        if x >= limite:
+            return f"{x / limite:.1f}{sufijo}"
+    return f"{x:.0f}"
+
+
+def _fila(r: Dict[str, Any]) -> str:
+    return (f"{r['escenario']:<16} {r['llamados']:>8} {r['segundos'] * 1e3:>10.1f} "
+            f"{r['por_llamado'] * 1e3:>10.1f} {r['conexiones']:>10} "
+            f"{_cantidad(r['bytes_subida']) + 'B':>8} {_cantidad(r['bytes_bajada']) + 'B':>8}")
+
+
+def _perfiles(args: argparse.Namespace) -> List[Tuple[str, Enlace]]:
+    perfiles = [(nombre, PERFILES[nombre]) for nombre in args.perfiles]
+    if args.rtt is not None or args.jitter is not None or args.mbps is not None:
+        perfiles.append(("personalizado", Enlace((args.rtt or 0.0) / 2e3, (args.jitter or 0.0) / 1e3,
+                                                  args.mbps * 1e6 / 8 if args.mbps else None)))
+    return perfiles
+
+
+def correr(args: argparse.Namespace, puerto: int, salida) -> List[Dict[str, Any]]:
+    resultados = []
+    for nombre, enlace in _perfiles(args):
+        print(f"\nperfil {nombre}: {enlace!r}", file=salida)
+        print(f"{'escenario':<16} {'llamados':>8} {'total ms':>10} {'ms/llamado':>10} "
+              f"{'conexiones':>10} {'subida':>8} {'bajada':>8}", file=salida)
+        with ProxyWAN((args.host, puerto), enlace, semilla=args.semilla) as proxy:
+            for escenario in args.escenarios:
+                r = medir(proxy, escenario, args)
+                r.update(perfil=nombre, retardo=enlace.retardo, jitter=enlace.jitter,
+                         ancho_banda=enlace.ancho_banda)
+                resultados.append(r)
+                print(_fila(r), file=salida, flush=True)
+        cerrar_conexiones()
+    return resultados
+
+
+def ejecutar(args: argparse.Namespace) -> int:
+    salida = sys.stderr if args.json == "-" else sys.stdout
+    texto = CARGAS["texto_20k"]()[0]
+    tam = args.kb * 1024
+    args.texto = (texto * (tam // len(texto) + 1))[:tam]
+    if args.puerto is not None:
+        resultados = correr(args, args.puerto, salida)
+    else:
+        args.host = HOST
+        with iniciar_servidor(args.modulo, args.asincrono) as puerto:
+            resultados = correr(args, puerto, salida)
+    if args.json:
+        informe = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "llamados": args.llamados,
+            "kb": args.kb,
+            "rondas": args.rondas,
+            "resultados": resultados,
+        }
+        if args.json == "-":
+            json.dump(informe, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(informe, f, indent=2)
+    return 0
+
+
+def configurar(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--perfiles", type=_lista(list(PERFILES)), default=list(PERFILES),
+                        help=f"separados por coma (por defecto todos: {', '.join(PERFILES)})")
+    parser.add_argument("--rtt", type=float, help="agrega un perfil con este RTT en ms")
+    parser.add_argument("--jitter", type=float, help="agrega un perfil con este jitter, en ms")
+    parser.add_argument("--mbps", type=float, help="agrega un perfil con este ancho de banda, en Mbit/s")
+    parser.add_argument("--escenarios", type=_lista(list(ESCENARIOS)), default=list(ESCENARIOS),
+                        help="separados por coma (por defecto todos)")
+    parser.add_argument("--llamados", type=int, default=20, help="llamados chicos por escenario")
+    parser.add_argument("--kb", type=int, default=256, help="tamaño del texto de echo_large_text")
+    parser.add_argument("--rondas", type=int, default=3, help="se reporta la mediana")
+    parser.add_argument("--semilla", type=int, default=0, help="semilla del jitter")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, help="servidor ya levantado (si no, se levanta uno local)")
+    parser.add_argument("--modulo", action="append",
+                        help="modulo con los metodos del servidor local (repetible; por defecto los de examples/)")
+    parser.add_argument("--asincrono", action="store_true", help="servidor local con AsyncServer")
+    parser.add_argument("--timeout", type=float, default=60.0, help="timeout de cada llamado")
+    parser.add_argument("--json", metavar="ARCHIVO", help="guarda los resultados en JSON ('-' para stdout)")
+    parser.set_defaults(ejecutar=ejecutar)
@@ -0,0 +1,152 @@
+import asyncio
+import socket
+import threading
+from typing import Callable, List, Optional
+
+from xmlrpc_redes import LectorHTTP
+
+# Tamaño del buffer de recepción de cada hilo y tope de lo que un hilo retiene
+# entre llamados (los cuerpos más grandes usan un bytearray propio y se liberan)
+TAM_PEDAZO = 64 * 1024
+MAX_RETENIDO = 4 * 1024 * 1024
+# Buffers por llamado a sendmsg (IOV_MAX suele ser 1024)
+MAX_IOV = 64
+
+_hilo = threading.local()
+
+
+def buffer_hilo(tam: int = TAM_PEDAZO) -> memoryview:
+    """Devuelve una vista de tam bytes sobre un bytearray reutilizable del hilo
+    actual. Solo vale hasta el siguiente buffer_hilo() del mismo hilo: quien
+    necesite conservar los datos debe copiarlos."""
+    buf = getattr(_hilo, "buf", None)
+    if buf is None or len(buf) < tam:
+        if tam > MAX_RETENIDO:
+            return memoryview(bytearray(tam))
+        buf = _hilo.buf = bytearray(max(tam, TAM_PEDAZO))
+    return memoryview(buf)[:tam]
+
+
+def recibir_completo(sock: socket.socket, vista: memoryview) -> int:
+    """Llena vista con recv_into; devuelve los bytes leídos (menos que len(vista)
+    si el otro extremo cerró antes)."""
+    leidos = 0
+    total = len(vista)
+    while leidos < total:
+        n = sock.recv_into(vista[leidos:])
+        if not n:
+            break
+        leidos += n
+    return leidos
+
+
+def recibir_pedazos(sock: socket.socket, restantes: int, destino: Callable[[memoryview], None]) -> int:
+    """Recibe hasta restantes bytes en el buffer del hilo pasándole cada pedazo a
+    destino (que no debe guardar la vista). Devuelve los bytes leídos."""
+    buf = buffer_hilo()
+    leidos = 0
+    while leidos < restantes:
+        n = sock.recv_into(buf, min(len(buf), restantes - leidos))
+        if not n:
+            break
+        leidos += n
+        destino(buf[:n])
+    return leidos
+
+
+def recibir_encabezado(sock: socket.socket, lector: LectorHTTP) -> bool:
+    """Recibe hasta tener el encabezado del mensaje actual del lector. Devuelve
+    False si la conexion se cerro antes; lanza ErrorHTTP si es invalido."""
+    buf = buffer_hilo()
+    while not lector.encabezado():
+        n = sock.recv_into(buf)
+        if not n:
+            return False
+        lector.alimentar(buf[:n])
+    return True
+
+
+def recibir_cuerpo(sock: socket.socket, lector: LectorHTTP, destino: Callable[[memoryview], None]) -> bool:
+    """Pasa a destino el cuerpo del mensaje actual del lector (destino no debe
+    guardar las vistas). Devuelve True si llego completo; lanza ErrorHTTP si el
+    framing es invalido."""
+    buf = buffer_hilo()
+    while not lector.terminado:
+        pedazo = lector.cuerpo()
+        if pedazo:
+            destino(pedazo)
+            continue
+        if lector.terminado:
+            break
+        faltan = lector.restantes
+        if faltan:
+            # Con el buffer del lector vacio el cuerpo va directo al destino
+            n = recibir_pedazos(sock, faltan, destino)
+            lector.descontar(n)
+            if n < faltan:
+                return False
+            continue
+        n = sock.recv_into(buf)
+        if not n:
+            return lector.cerrar()
+        lector.alimentar(buf[:n])
+    return True
+
+
+def enviar_partes(sock: socket.socket, partes: List[bytes]) -> None:
+    """Como sendall, pero recibe varios buffers y se los pasa juntos al kernel
+    (sendmsg) en lugar de concatenarlos."""
+    if not hasattr(sock, "sendmsg"):
+        for parte in partes:
+            sock.sendall(parte)
+        return
+    vistas = [memoryview(p) for p in partes if len(p)]
+    while vistas:
+        enviados = sock.sendmsg(vistas[:MAX_IOV])
+        # Descartar lo que ya salio; la primera vista puede quedar a medias
+        while vistas and enviados >= len(vistas[0]):
+            enviados -= len(vistas.pop(0))
+        if enviados:
+            vistas[0] = vistas[0][enviados:]
+
+
+async def _leer(reader: asyncio.StreamReader, tam: int, timeout: Optional[float]) -> bytes:
+    if timeout is None:
+        return await reader.read(tam)
+    return await asyncio.wait_for(reader.read(tam), timeout)
+
+
+async def recibir_encabezado_async(reader: asyncio.StreamReader, lector: LectorHTTP,
+                                   timeout: Optional[float] = None) -> bool:
+    """Como recibir_encabezado, sobre un StreamReader. Con timeout cada lectura
+    puede esperar a lo sumo esos segundos (asyncio.TimeoutError)."""
+    while not lector.encabezado():
+        data = await _leer(reader, TAM_PEDAZO, timeout)
+        if not data:
+            return False
+        lector.alimentar(data)
+    return True
+
+
+async def recibir_cuerpo_async(reader: asyncio.StreamReader, lector: LectorHTTP,
+                               destino: Callable[[bytes], None], timeout: Optional[float] = None) -> bool:
+    """Como recibir_cuerpo, sobre un StreamReader (timeout como en
+    recibir_encabezado_async)."""
+    while not lector.terminado:
+        pedazo = lector.cuerpo()
+        if pedazo:
+            destino(pedazo)
+            continue
+        if lector.terminado:
+            break
+        faltan = lector.restantes
+        data = await _leer(reader, min(TAM_PEDAZO, faltan or TAM_PEDAZO), timeout)
+        if not data:
+            return lector.cerrar()
+        if faltan:
+            # Con el buffer del lector vacio el cuerpo va directo al destino
+            lector.descontar(len(data))
+            destino(data)
+        else:
+            lector.alimentar(data)
+    return True
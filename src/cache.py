@@ -0,0 +1,157 @@
+import functools
+import inspect
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class CacheLRU:
+    """Cache LRU thread-safe con vencimiento opcional (TTL) y contadores.
+
+    Guarda como maximo max_entradas; al llenarse desaloja la entrada usada hace
+    mas tiempo. Con ttl (segundos) las entradas vencen y cuentan como miss.
+    Con max_bytes los valores (bytes) ademas no pueden sumar mas de max_bytes.
+    """
+
+    def __init__(self, max_entradas: int = 1024, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        if max_entradas < 1:
+            raise ValueError("CacheLRU: max_entradas debe ser al menos 1")
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._datos: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.desalojos = 0
+        self.vencidos = 0
+
+    def obtener(self, clave: Hashable) -> Tuple[bool, Any]:
+        """Devuelve (encontrado, valor); None es un valor valido."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                valor, vence, tam = entrada
+                if vence >= time.monotonic():
+                    self._datos.move_to_end(clave)
+                    self.hits += 1
+                    return True, valor
+                del self._datos[clave]
+                self._bytes -= tam
+                self.vencidos += 1
+            self.misses += 1
+            return False, None
+
+    def guardar(self, clave: Hashable, valor: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        vence = time.monotonic() + ttl if ttl is not None else float("inf")
+        tam = len(valor) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and tam > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[2]
+            self._datos[clave] = (valor, vence, tam)
+            self._bytes += tam
+            while len(self._datos) > self.max_entradas or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._bytes -= self._datos.popitem(last=False)[1][2]
+                self.desalojos += 1
+
+    def invalidar(self, clave: Hashable) -> bool:
+        with self._lock:
+            entrada = self._datos.pop(clave, None)
+            if entrada is None:
+                return False
+            self._bytes -= entrada[2]
+            return True
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.hits + self.misses
+            stats = {
+                "entradas": len(self._datos),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / consultas if consultas else 0.0,
+                "desalojos": self.desalojos,
+                "vencidos": self.vencidos,
+            }
+            if self.max_bytes is not None:
+                stats["bytes"] = self._bytes
+            return stats
+
+
+def congelar(valor: Any) -> Hashable:
+    """Convierte parametros deserializados (listas, dicts) en una clave hashable.
+
+    Incluye el tipo de los escalares para que suma(1, 2) y suma(True, 2) no
+    compartan entrada.
+    """
+    if isinstance(valor, (list, tuple)):
+        return tuple(congelar(v) for v in valor)
+    if isinstance(valor, dict):
+        return ("struct", frozenset((k, congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (bytearray, memoryview)):
+        return (bytes, bytes(valor))
+    if isinstance(valor, array):
+        return (array, valor.typecode, valor.tobytes())
+    return (valor.__class__, valor)
+
+
+def memoizar(func: Callable[..., Any], cache: CacheLRU,
+             clave: Optional[Callable[..., Hashable]] = None) -> Callable[..., Any]:
+    """Envuelve func para que sus resultados se guarden en cache.
+
+    La clave por defecto son los parametros congelados; clave(*params) permite
+    elegir otra. Las excepciones no se guardan. Soporta funciones async def.
+    Si func devuelve un iterador se guarda (y se devuelve) como lista: el
+    iterador se agotaria con el primer llamado y los hits responderian [].
+    La envoltura expone .cache y .clave para invalidar entradas.
+    """
+    calcular_clave = clave or (lambda *params: congelar(params))
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def envoltura(*params):
+            k = calcular_clave(*params)
+            encontrado, valor = cache.obtener(k)
+            if encontrado:
+                return valor
+            valor = await func(*params)
+            if isinstance(valor, AsyncIterator):
+                valor = [v async for v in valor]
+            elif isinstance(valor, Iterator):
+                valor = list(valor)
+            cache.guardar(k, valor)
+            return valor
+    else:
+        @functools.wraps(func)
+        def envoltura(*params):
+            k = calcular_clave(*params)
+            encontrado, valor = cache.obtener(k)
+            if encontrado:
+                return valor
+            valor = func(*params)
+            if isinstance(valor, Iterator):
+                valor = list(valor)
+            cache.guardar(k, valor)
+            return valor
+
+    envoltura.cache = cache
+    envoltura.clave = calcular_clave
+    return envoltura
@@ -1,44 +1,367 @@
+import array
+import copy
+import select
 import socket
-from typing import Any, List
-from xmlrpc_redes import construir_llamado_xml, parsear_respuesta_xml, construir_llamado_http, parsear_respuesta_http
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from xmlrpc_redes import (
+    construir_llamado_xml, parsear_respuesta_xml, construir_llamado_http_partes,
+    conexion_persistente, descomprimir, MIN_COMPRIMIR, NIVEL_COMPRESION, LectorHTTP, ErrorHTTP,
+    ParserRespuesta, Descompresor
+)
+from cache import CacheLRU, congelar
+from buffers import buffer_hilo, recibir_completo, recibir_encabezado, recibir_cuerpo, enviar_partes
+
+
+# Limites por defecto de PoolConexiones: sockets libres guardados y segundos ociosos
+MAX_CONEXIONES = 8
+MAX_INACTIVIDAD = 10.0
+
+
+class PoolConexiones:
+    """Pool thread-safe de sockets keep-alive hacia un mismo (host, puerto).
+
+    Guarda como maximo max_conexiones sockets libres; si hay mas llamados
+    concurrentes se abren sockets extra que se cierran al devolverse. Los sockets
+    que llevan mas de max_inactividad segundos sin usarse se descartan.
+    """
+
+    def __init__(self, address: str, port: int, max_conexiones: int = MAX_CONEXIONES,
+                 max_inactividad: float = MAX_INACTIVIDAD):
+        self.addr = address
+        self.port = port
+        self.max_conexiones = max_conexiones
+        self.max_inactividad = max_inactividad
+        self._libres: List[Tuple[socket.socket, float]] = []
+        self._lock = threading.Lock()
+
+    def obtener(self, timeout: float, reutilizar: bool = True) -> Tuple[socket.socket, bool]:
+        """Devuelve (socket, reutilizado). Prefiere el socket libre usado mas recientemente."""
+        ahora = time.monotonic()
+        while reutilizar:
+            with self._lock:
+                if not self._libres:
+                    break
+                s, usado = self._libres.pop()
+            if ahora - usado <= self.max_inactividad and self._sano(s):
+                s.settimeout(timeout)
+                return s, True
+            s.close()
+        s = socket.create_connection((self.addr, self.port), timeout=timeout)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return s, False
+
+    def devolver(self, s: socket.socket) -> None:
+        ahora = time.monotonic()
+        with self._lock:
+            # Desalojar los ociosos (los mas viejos estan al principio)
+            while self._libres and ahora - self._libres[0][1] > self.max_inactividad:
+                self._libres.pop(0)[0].close()
+            if len(self._libres) < self.max_conexiones:
+                self._libres.append((s, ahora))
+                return
+        s.close()
+
+    def cerrar(self) -> None:
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for s, _ in libres:
+            s.close()
+
+    @staticmethod
+    def _sano(s: socket.socket) -> bool:
+        # Un socket ocioso sano no tiene nada para leer; si es legible es
+        # porque el servidor lo cerro (EOF) o mando datos inesperados.
+        try:
+            legibles, _, _ = select.select([s], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not legibles
+
+
+_pools: Dict[Tuple[str, int, int, float], PoolConexiones] = {}
+_pools_lock = threading.Lock()
+
+
+def obtener_pool(address: str, port: int, max_conexiones: int = MAX_CONEXIONES,
+                 max_inactividad: float = MAX_INACTIVIDAD) -> PoolConexiones:
+    """Pool compartido por todos los Client que apuntan al mismo (host, puerto)
+    con los mismos limites."""
+    clave = (address, port, max_conexiones, max_inactividad)
+    with _pools_lock:
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = _pools[clave] = PoolConexiones(address, port, max_conexiones, max_inactividad)
+        return pool
+
+
+def cerrar_conexiones() -> None:
+    """Cierra todos los sockets libres de todos los pools."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.cerrar()
+
 
 class Client:
-    def __init__(self, address: str, port: int, timeout: float):
+    def __init__(self, address: str, port: int, timeout: float, keep_alive: bool = True,
+                 cache: Optional[Dict[str, Optional[float]]] = None, max_entradas_cache: int = 1024,
+                 compresion: bool = False, min_comprimir: int = MIN_COMPRIMIR,
+                 nivel_compresion: int = NIVEL_COMPRESION, arreglos: bool = False,
+                 max_conexiones: int = MAX_CONEXIONES, max_inactividad: float = MAX_INACTIVIDAD):
         self.addr = address
         self.port = port
         self.timeout = timeout
+        self.keep_alive = keep_alive
+        # Sockets keep-alive libres que se guardan y segundos que pueden estar ociosos
+        self.pool = obtener_pool(address, port, max_conexiones, max_inactividad) if keep_alive else None
+        # Con compresion=True se aceptan respuestas gzip/deflate y se comprimen
+        # con gzip los llamados de al menos min_comprimir bytes
+        self.compresion = compresion
+        self.min_comprimir = min_comprimir
+        self.nivel_compresion = nivel_compresion
+        # Con arreglos=True los arreglos de solo int o solo float llegan como array.array
+        self.arreglos = arreglos
+        # Cache local de resultados: cache = {método: ttl en segundos (None = sin vencimiento)}.
+        # Solo los métodos listados se cachean; los faults nunca se guardan
+        self.ttl_cache: Dict[str, Optional[float]] = dict(cache or {})
+        self.cache = CacheLRU(max_entradas_cache) if self.ttl_cache else None
 
     def __getattr__(self, method_name: str):
         def _remote_call(*args):
-            return self._invoke(method_name, list(args))
+            return self._llamar(method_name, list(args))
         return _remote_call
 
+    @property
+    def sin_cache(self) -> "_SinCache":
+        """Proxy que va siempre a la red y refresca el cache: conn.sin_cache.metodo(args)."""
+        return _SinCache(self)
+
+    def invalidar_cache(self, nombre: Optional[str] = None, *params: Any) -> None:
+        """Borra la entrada de nombre(*params), o todo el cache si no se pasa nombre."""
+        if self.cache is None:
+            return
+        if nombre is None:
+            self.cache.limpiar()
+            return
+        clave = _clave_cache(nombre, params)
+        if clave is not None:
+            self.cache.invalidar(clave)
+
+    def estadisticas_cache(self) -> Dict[str, Any]:
+        """Hits, misses, hit_rate, entradas, desalojos y vencidos del cache local."""
+        return self.cache.estadisticas() if self.cache is not None else {}
+
+    def _llamar(self, method: str, params: List[Any], usar_cache: bool = True) -> Any:
+        if self.cache is None or method not in self.ttl_cache:
+            return self._invoke(method, params)
+        clave = _clave_cache(method, params)
+        if clave is None:
+            return self._invoke(method, params)
+        if usar_cache:
+            encontrado, res = self.cache.obtener(clave)
+            if encontrado:
+                # Copia para que el llamador no modifique el valor guardado
+                return copy.deepcopy(res)
+        res = self._invoke(method, params)
+        self.cache.guardar(clave, copy.deepcopy(res), self.ttl_cache[method])
+        return res
+
     def _invoke(self, method: str, params: List[Any]) -> Any:
         # Construir XML-RPC
-        body = construir_llamado_xml(method, params)
+        return self.llamar_xml(construir_llamado_xml(method, params))
+
+    def llamar_xml(self, body: Union[str, bytes]) -> Any:
+        """Envia un <methodCall> ya armado (por ejemplo uno capturado) y devuelve
+        el resultado; lanza ErrorRPC si el servidor responde un fault."""
         # Construir llamado HTTP
-        http = construir_llamado_http(f"{self.addr}:{self.port}", body)
-        # Abrir socket y enviar
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(self.timeout)
-            s.connect((self.addr, self.port))
-            s.sendall(http)
-            # Recibir respuesta completa
-            data = b""
-            while True:
-                chunk = s.recv(4096)
-                if not chunk:
-                    break
-                data += chunk
-        # Parsear HTTP y XML-RPC
-        _, encabezados, cuerpo = parsear_respuesta_http(data)
-        cuerpo_xml = cuerpo.decode()
-        ok, res = parsear_respuesta_xml(cuerpo_xml)
+        http = construir_llamado_http_partes(f"{self.addr}:{self.port}", body, self.keep_alive,
+                                             self.compresion, self.min_comprimir, self.nivel_compresion)
+        # Enviar por un socket del pool (o uno nuevo si no hay keep-alive)
+        if self.pool is None:
+            with socket.create_connection((self.addr, self.port), timeout=self.timeout) as s:
+                _, encabezados, cuerpo, _ = self._enviar_y_recibir(s, http, self.arreglos)
+        else:
+            s, reutilizado = self.pool.obtener(self.timeout)
+            try:
+                try:
+                    llamado, encabezados, cuerpo, completo = self._enviar_y_recibir(s, http, self.arreglos)
+                except ConnectionError:
+                    if not reutilizado:
+                        raise
+                    # El servidor cerro el socket ocioso justo antes de usarlo:
+                    # el llamado no llego a procesarse, se reintenta en uno nuevo
+                    s.close()
+                    s, reutilizado = self.pool.obtener(self.timeout, reutilizar=False)
+                    llamado, encabezados, cuerpo, completo = self._enviar_y_recibir(s, http, self.arreglos)
+            except BaseException:
+                s.close()
+                raise
+            if completo and conexion_persistente(llamado, encabezados):
+                self.pool.devolver(s)
+            else:
+                s.close()
+        if isinstance(cuerpo, ParserRespuesta):
+            # Respuesta sin Content-Length: ya se fue parseando al recibirla
+            ok, res = cuerpo.resultado()
+        else:
+            codificacion = encabezados.get("content-encoding", "identity")
+            if codificacion.lower() != "identity":
+                cuerpo = descomprimir(cuerpo, codificacion)
+            # Parsear XML-RPC (directo desde los bytes)
+            ok, res = parsear_respuesta_xml(cuerpo, self.arreglos)
         if not ok:
-            num_err = res.get("faultCode", 5)
-            mensaje_err = res.get("faultString", "Error desconocido")
-            raise RuntimeError(f"Error RPC {num_err}: {mensaje_err}")
+            raise error_rpc(res)
         return res
 
-def connect(address: str, port: int, timeout: float = 20.0) -> Client:
-    return Client(address, port, timeout)
+    def multicall(self) -> "MultiCall":
+        """Agrupa varios llamados en un solo request system.multicall:
+
+            with conn.multicall() as mc:
+                mc.suma(1, 2)
+                mc.concat("a", "b")
+            suma, concat = mc.resultados
+        """
+        return MultiCall(self)
+
+    @staticmethod
+    def _enviar_y_recibir(s: socket.socket, http: List[bytes], arreglos: bool = False
+                          ) -> Tuple[str, Dict[str, str], Union[memoryview, ParserRespuesta], bool]:
+        """Envia el llamado y lee una respuesta delimitada por Content-Length o chunked.
+
+        http es [encabezado, cuerpo] (construir_llamado_http_partes).
+        Devuelve (llamado, encabezados, cuerpo, completo); completo indica que la
+        respuesta quedo bien delimitada y el socket puede reutilizarse.
+        El cuerpo se recibe con recv_into sobre un buffer del tamaño de
+        Content-Length (el del hilo si es chico): es una vista que solo vale
+        hasta el siguiente llamado desde el mismo hilo.
+        Sin Content-Length (resultados de generadores, en chunked) el cuerpo se
+        descomprime y parsea a medida que llega y se devuelve el ParserRespuesta.
+        Lanza ConnectionError si el servidor cierra sin responder nada.
+        """
+        enviar_partes(s, http)
+        lector = LectorHTTP(respuesta=True)
+        if not recibir_encabezado(s, lector):
+            if lector.pendientes:
+                # Algo respondio: no es un socket ocioso cerrado, no se reintenta
+                raise ErrorHTTP("Respuesta HTTP incompleta")
+            raise ConnectionError("El servidor cerró la conexión sin responder")
+        if lector.largo is None:
+            # Chunked o sin delimitar (termina cuando el servidor cierra)
+            parser = ParserRespuesta(arreglos)
+            descompresor = respuesta_comprimida(lector.encabezados, parser.alimentar)
+            completo = recibir_cuerpo(s, lector, descompresor.alimentar if descompresor else parser.alimentar)
+            if lector.chunked and not completo:
+                # El servidor corto el stream (por ejemplo, fallo el generador)
+                raise ErrorHTTP("Respuesta HTTP incompleta")
+            if descompresor is not None:
+                descompresor.terminar()
+            return lector.llamado, lector.encabezados, parser, lector.chunked and not lector.pendientes
+        cuerpo = buffer_hilo(lector.largo)
+        recibidos = lector.leer_en(cuerpo)
+        n = recibir_completo(s, cuerpo[recibidos:])
+        lector.descontar(n)
+        recibidos += n
+        # Si el servidor mando de mas el socket no queda en un estado confiable
+        completo = lector.terminado and not lector.pendientes
+        return lector.llamado, lector.encabezados, cuerpo[:recibidos], completo
+
+
+class _SinCache:
+    def __init__(self, client: Client):
+        self._client = client
+
+    def __getattr__(self, method_name: str):
+        def _remote_call(*args):
+            return self._client._llamar(method_name, list(args), usar_cache=False)
+        return _remote_call
+
+
+class MultiCall:
+    """Acumula llamados y los envía juntos al salir del bloque with (o con ejecutar()).
+
+    resultados queda en el mismo orden que los llamados; los que fallaron en el
+    servidor aparecen como RuntimeError (sin lanzarse). Iterar sobre el objeto
+    devuelve los resultados y lanza el RuntimeError del primer llamado fallido.
+    """
+
+    def __init__(self, client: Client):
+        self._client = client
+        self._llamados: List[Dict[str, Any]] = []
+        self.resultados: List[Any] = []
+
+    def __getattr__(self, method_name: str):
+        def _encolar(*args):
+            self._llamados.append({"methodName": method_name, "params": list(args)})
+        return _encolar
+
+    def __enter__(self) -> "MultiCall":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.ejecutar()
+
+    def __iter__(self):
+        for res in self.resultados:
+            if isinstance(res, RuntimeError):
+                raise res
+            yield res
+
+    def ejecutar(self) -> List[Any]:
+        llamados, self._llamados = self._llamados, []
+        if not llamados:
+            self.resultados = []
+            return self.resultados
+        respuestas = self._client._invoke("system.multicall", [llamados])
+        # Con arreglos=True el [resultado] de un llamado numerico llega como array.array
+        self.resultados = [r[0] if isinstance(r, (list, array.array)) and r else error_rpc(r)
+                           for r in respuestas]
+        return self.resultados
+
+
+def _clave_cache(method: str, params: Any) -> Optional[Tuple[str, Any]]:
+    """Clave del cache local, o None si los parametros no son hashables (un
+    set, objetos propios): esos llamados van a la red sin pasar por el cache."""
+    clave = (method, congelar(params))
+    try:
+        hash(clave)
+    except TypeError:
+        return None
+    return clave
+
+
+def respuesta_comprimida(encabezados: Dict[str, str], destino: Callable[[bytes], None]) -> Optional[Descompresor]:
+    """Descompresor hacia destino para el Content-Encoding de la respuesta (None si no viene comprimida)."""
+    codificacion = encabezados.get("content-encoding", "identity")
+    if codificacion.lower() == "identity":
+        return None
+    return Descompresor(codificacion, destino)
+
+
+class ErrorRPC(RuntimeError):
+    """Fault recibido del servidor; codigo y mensaje son los del struct."""
+
+    def __init__(self, codigo: Any, mensaje: Any):
+        super().__init__(f"Error RPC {codigo}: {mensaje}")
+        self.codigo = codigo
+        self.mensaje = mensaje
+
+
+def error_rpc(fault: Any) -> ErrorRPC:
+    """Convierte el struct de un fault en la excepción que lanza el cliente."""
+    if not isinstance(fault, dict):
+        fault = {}
+    num_err = fault.get("faultCode", 5)
+    mensaje_err = fault.get("faultString", "Error desconocido")
+    return ErrorRPC(num_err, mensaje_err)
+
+
+def connect(address: str, port: int, timeout: float = 20.0, keep_alive: bool = True,
+            cache: Optional[Dict[str, Optional[float]]] = None, max_entradas_cache: int = 1024,
+            compresion: bool = False, min_comprimir: int = MIN_COMPRIMIR,
+            nivel_compresion: int = NIVEL_COMPRESION, arreglos: bool = False,
+            max_conexiones: int = MAX_CONEXIONES, max_inactividad: float = MAX_INACTIVIDAD) -> Client:
+    return Client(address, port, timeout, keep_alive, cache, max_entradas_cache,
+                  compresion, min_comprimir, nivel_compresion, arreglos, max_conexiones, max_inactividad)
@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict
+
+
+class ColaLlena(Exception):
+    """La cola de trabajos pendientes del pool esta llena."""
+
+
+class PoolHilos:
+    """Pool de hilos acotado con cola de trabajos pendientes.
+
+    Arranca con min_hilos y crea hilos bajo demanda hasta max_hilos cuando hay
+    trabajos esperando y ningun hilo libre. Los hilos por encima de min_hilos que
+    pasan inactividad segundos sin trabajo terminan solos. La cola admite como
+    maximo max_cola trabajos pendientes.
+    """
+
+    def __init__(self, min_hilos: int = 4, max_hilos: int = 128, max_cola: int = 256,
+                 inactividad: float = 30.0):
+        if min_hilos < 0 or max_hilos < 1 or min_hilos > max_hilos:
+            raise ValueError("PoolHilos: se requiere 0 <= min_hilos <= max_hilos y max_hilos >= 1")
+        self.min_hilos = min_hilos
+        self.max_hilos = max_hilos
+        self.inactividad = inactividad
+        self._cola: "queue.Queue" = queue.Queue(max_cola)
+        self._lock = threading.Lock()
+        self._hilos = 0
+        self._ociosos = 0
+        # Trabajos encolados que ningun hilo tomo todavia. Se actualiza junto con
+        # _ociosos bajo el lock: qsize() no sirve para decidir si crear un hilo
+        # porque un hilo puede haber sacado el trabajo sin descontarse aun
+        self._pendientes = 0
+        # Contadores
+        self._encolados = 0
+        self._rechazados = 0
+        self._iniciados = 0
+        self._completados = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        for _ in range(min_hilos):
+            self._crear_hilo()
+
+    def enviar(self, func: Callable[..., Any], *args: Any, bloquear: bool = True) -> None:
+        """Encola func(*args). Si la cola esta llena espera lugar (bloquear=True)
+        o lanza ColaLlena."""
+        try:
+            self._cola.put((func, args, time.monotonic()), block=bloquear)
+        except queue.Full:
+            with self._lock:
+                self._rechazados += 1
+            raise ColaLlena("Cola de trabajos llena")
+        with self._lock:
+            self._encolados += 1
+            self._pendientes += 1
+            if self._pendientes > self._ociosos and self._hilos < self.max_hilos:
+                self._crear_hilo()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hilos": self._hilos,
+                "ociosos": self._ociosos,
+                "cola": self._cola.qsize(),
+                "encolados": self._encolados,
+                "rechazados": self._rechazados,
+                "iniciados": self._iniciados,
+                "completados": self._completados,
+                "espera_promedio": self._espera_total / self._iniciados if self._iniciados else 0.0,
+                "espera_max": self._espera_max,
+            }
+
+    def _crear_hilo(self) -> None:
+        # Se llama con el lock tomado (o desde __init__)
+        self._hilos += 1
+        self._ociosos += 1
+        threading.Thread(target=self._trabajar, daemon=True).start()
+
+    def _trabajar(self) -> None:
+        while True:
+            try:
+                func, args, encolado = self._cola.get(timeout=self.inactividad)
+            except queue.Empty:
+                with self._lock:
+                    # Con trabajos pendientes no se retira: enviar() pudo haber
+                    # contado a este hilo como ocioso y no crear otro
+                    if self._hilos > self.min_hilos and self._pendientes == 0:
+                        self._hilos -= 1
+                        self._ociosos -= 1
+                        return
+                continue
+            espera = time.monotonic() - encolado
+            with self._lock:
+                self._pendientes -= 1
+                self._ociosos -= 1
+                self._iniciados += 1
+                self._espera_total += espera
+                self._espera_max = max(self._espera_max, espera)
+            try:
+                func(*args)
+            except Exception:
+                # Igual que un Thread suelto: se reporta y el hilo sigue vivo
+                traceback.print_exc()
+            finally:
+                with self._lock:
+                    self._ociosos += 1
+                    self._completados += 1
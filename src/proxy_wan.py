@@ -0,0 +1,267 @@
+"""Proxy TCP que emula un enlace WAN entre un cliente y un servidor.
+
+Reenvia los bytes de cada conexion en paquetes de a lo sumo tam_paquete bytes
+y demora cada paquete segun el Enlace de su sentido: retardo fijo, jitter
+uniforme en [-jitter, +jitter] y un tope de ancho de banda que los serializa
+como la cola de un router. Los paquetes se entregan en orden (es TCP: el jitter
+no reordena) y abrir una conexion cuesta un RTT, como el handshake. Sirve para
+medir keep-alive, multicall y compresion en condiciones de WAN en una sola
+maquina, sin Mininet.
+
+Desde un programa sincronico (el proxy corre en su propio hilo):
+
+    with ProxyWAN(("127.0.0.1", 8000), PERFILES["wan"]) as proxy:
+        conn = connect("127.0.0.1", proxy.puerto)
+
+Desde asyncio: `async with ProxyWAN(...) as proxy:`. O como programa:
+
+    python proxy_wan.py --destino 127.0.0.1:8000 --puerto 9000 --perfil mininet
+    python proxy_wan.py --destino 127.0.0.1:8000 --puerto 9000 --perfil wan --mbps 2
+    python proxy_wan.py --destino 127.0.0.1:8000 --puerto 9000 --rtt 80 --jitter 5 --mbps 10
+"""
+import argparse
+import asyncio
+import random
+import socket
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+# Lo que entra en un segmento TCP con MTU 1500 (con timestamps)
+TAM_PAQUETE = 1448
+TAM_LECTURA = 64 * 1024
+
+
+class Enlace:
+    """Un sentido del enlace.
+
+    retardo y jitter en segundos (jitter se suma uniforme en [-jitter, +jitter]),
+    ancho_banda en bytes por segundo (None = sin tope) y buffer los bytes que el
+    enlace retiene antes de dejar de leer del emisor (contrapresion de TCP).
+    """
+
+    def __init__(self, retardo: float = 0.0, jitter: float = 0.0, ancho_banda: Optional[float] = None,
+                 tam_paquete: int = TAM_PAQUETE, buffer: int = 4 * 1024 * 1024):
+        if retardo < 0 or jitter < 0 or tam_paquete < 1 or buffer < 1:
+            raise ValueError("Enlace: retardo, jitter, tam_paquete y buffer no pueden ser negativos")
+        if ancho_banda is not None and ancho_banda <= 0:
+            raise ValueError("Enlace: ancho_banda debe ser positivo (o None para no limitarlo)")
+        self.retardo = retardo
+        self.jitter = jitter
+        self.ancho_banda = ancho_banda
+        self.tam_paquete = tam_paquete
+        self.buffer = buffer
+
+    def __repr__(self) -> str:
+        bw = f"{self.ancho_banda * 8 / 1e6:g} Mbit/s" if self.ancho_banda else "sin tope"
+        return f"Enlace(retardo={self.retardo * 1e3:g} ms, jitter={self.jitter * 1e3:g} ms, {bw})"
+
+
+def _mbps(mbit: float) -> float:
+    return mbit * 1e6 / 8
+
+
+# Perfiles simetricos (el retardo es de un sentido: RTT = 2 * retardo). mininet
+# aproxima server1.pcap: RTT minimo de ~120 ms en el handshake y mucha variacion
+PERFILES: Dict[str, Enlace] = {
+    "lan": Enlace(retardo=0.00025, ancho_banda=_mbps(1000)),
+    "wan": Enlace(retardo=0.02, jitter=0.002, ancho_banda=_mbps(50)),
+    "movil": Enlace(retardo=0.05, jitter=0.015, ancho_banda=_mbps(5)),
+    "mininet": Enlace(retardo=0.06, jitter=0.03, ancho_banda=_mbps(10)),
+}
+
+
+class ProxyWAN:
+    """Escucha en direccion y reenvia cada conexion a destino a traves de dos
+    Enlace: subida (cliente -> servidor) y bajada (por defecto igual a subida).
+
+    Cuenta conexiones y bytes reenviados en cada sentido (reiniciar_contadores).
+    """
+
+    def __init__(self, destino: Tuple[str, int], subida: Optional[Enlace] = None,
+                 bajada: Optional[Enlace] = None, direccion: Tuple[str, int] = ("127.0.0.1", 0),
+                 semilla: Optional[int] = None):
+        self.destino = destino
+        self.subida = subida or Enlace()
+        self.bajada = bajada or self.subida
+        self.direccion = direccion
+        self.puerto = 0
+        self.rnd = random.Random(semilla)
+        self.conexiones = 0
+        self.bytes_subida = 0
+        self.bytes_bajada = 0
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        self._tareas: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hilo: Optional[threading.Thread] = None
+
+    def reiniciar_contadores(self) -> None:
+        self.conexiones = self.bytes_subida = self.bytes_bajada = 0
+
+    async def iniciar(self) -> None:
+        self._servidor = await asyncio.start_server(self._atender, self.direccion[0], self.direccion[1])
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+
+    async def cerrar(self) -> None:
+        if self._servidor is not None:
+            self._servidor.close()
+        # Desde 3.12 wait_closed espera a que terminen las conexiones abiertas
+        for tarea in list(self._tareas):
+            tarea.cancel()
+        if self._tareas:
+            await asyncio.gather(*self._tareas, return_exceptions=True)
+        if self._servidor is not None:
+            await self._servidor.wait_closed()
+            self._servidor = None
+
+    async def __aenter__(self) -> "ProxyWAN":
+        await self.iniciar()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.cerrar()
+
+    def __enter__(self) -> "ProxyWAN":
+        # Event loop propio en un hilo aparte, para usarlo desde codigo sincronico
+        self._loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(target=self._loop.run_forever, name="proxy_wan", daemon=True)
+        self._hilo.start()
+        asyncio.run_coroutine_threadsafe(self.iniciar(), self._loop).result()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        asyncio.run_coroutine_threadsafe(self.cerrar(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._hilo.join()
+        self._loop.close()
+
+    async def _atender(self, reader_c: asyncio.StreamReader, writer_c: asyncio.StreamWriter) -> None:
+        tarea = asyncio.current_task()
+        self._tareas.add(tarea)
+        writer_s = None
+        try:
+            self.conexiones += 1
+            # El handshake TCP cuesta un RTT antes de que el primer byte salga
+            await asyncio.sleep(self.subida.retardo + self.bajada.retardo)
+            try:
+                reader_s, writer_s = await asyncio.open_connection(*self.destino)
+            except OSError:
+                return
+            for writer in (writer_c, writer_s):
+                writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            bombas = [asyncio.ensure_future(self._bombear(self.subida, reader_c, writer_s, True)),
+                      asyncio.ensure_future(self._bombear(self.bajada, reader_s, writer_c, False))]
+            try:
+                await asyncio.gather(*bombas)
+            finally:
+                # Si un sentido fallo, el otro no tiene a donde entregar
+                for bomba in bombas:
+                    bomba.cancel()
+        except (OSError, asyncio.CancelledError):
+            pass
+        finally:
+            for writer in (writer_c, writer_s):
+                if writer is not None:
+                    writer.close()
+            self._tareas.discard(tarea)
+
+    async def _bombear(self, enlace: Enlace, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                       es_subida: bool) -> None:
+        """Lee de un extremo y entrega al otro cada paquete en su instante de llegada."""
+        loop = asyncio.get_running_loop()
+        cola: "asyncio.Queue" = asyncio.Queue(max(enlace.buffer // enlace.tam_paquete, 1))
+
+        async def entregar():
+            entrega, paquete = await cola.get()
+            while paquete is not None:
+                espera = entrega - loop.time()
+                if espera > 0:
+                    await writer.drain()
+                    await asyncio.sleep(espera)
+                writer.write(paquete)
+                try:
+                    entrega, paquete = cola.get_nowait()
+                except asyncio.QueueEmpty:
+                    await writer.drain()
+                    entrega, paquete = await cola.get()
+            await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+
+        bombeo = asyncio.current_task()
+        entregador = asyncio.ensure_future(entregar())
+        # Si falla la escritura se deja de leer (la cola podria estar llena)
+        entregador.add_done_callback(lambda t: t.cancelled() or t.exception() is None or bombeo.cancel())
+        libre = ultima = 0.0
+        try:
+            while True:
+                datos = await reader.read(TAM_LECTURA)
+                if not datos:
+                    break
+                if es_subida:
+                    self.bytes_subida += len(datos)
+                else:
+                    self.bytes_bajada += len(datos)
+                for i in range(0, len(datos), enlace.tam_paquete):
+                    paquete = datos[i:i + enlace.tam_paquete]
+                    # El paquete sale cuando el enlace termina de transmitir los
+                    # anteriores y llega retardo (+ jitter) despues, nunca antes
+                    # que el paquete anterior
+                    salida = loop.time()
+                    if enlace.ancho_banda:
+                        salida = libre = max(libre, salida) + len(paquete) / enlace.ancho_banda
+                    entrega = salida + enlace.retardo
+                    if enlace.jitter:
+                        entrega += self.rnd.uniform(-enlace.jitter, enlace.jitter)
+                    ultima = max(entrega, ultima)
+                    await cola.put((ultima, paquete))
+        except BaseException:
+            entregador.cancel()
+            raise
+        # Fin del emisor: se entrega lo que queda en el enlace y se pasa el FIN
+        await cola.put((0.0, None))
+        await entregador
+
+
+def _extremo(texto: str) -> Tuple[str, int]:
+    host, _, puerto = texto.rpartition(":")
+    return host or "127.0.0.1", int(puerto)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python proxy_wan.py", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--destino", type=_extremo, required=True, help="HOST:PUERTO del servidor")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=9000)
+    parser.add_argument("--perfil", choices=sorted(PERFILES),
+                        help="parametros predefinidos (las demas opciones los reemplazan)")
+    parser.add_argument("--rtt", type=float, help="ida y vuelta en ms (por defecto 0)")
+    parser.add_argument("--jitter", type=float, help="jitter de cada sentido en ms (por defecto 0)")
+    parser.add_argument("--mbps", type=float, help="ancho de banda de cada sentido en Mbit/s (por defecto sin tope)")
+    parser.add_argument("--tam-paquete", type=int, help=f"bytes por paquete (por defecto {TAM_PAQUETE})")
+    args = parser.parse_args()
+    base = PERFILES[args.perfil] if args.perfil else Enlace()
+    try:
+        enlace = Enlace(base.retardo if args.rtt is None else args.rtt / 2e3,
+                        base.jitter if args.jitter is None else args.jitter / 1e3,
+                        base.ancho_banda if args.mbps is None else _mbps(args.mbps),
+                        base.tam_paquete if args.tam_paquete is None else args.tam_paquete,
+                        base.buffer)
+    except ValueError as e:
+        parser.error(str(e))
+
+    async def servir():
+        proxy = ProxyWAN(args.destino, enlace, direccion=(args.host, args.puerto))
+        await proxy.iniciar()
+        print(f"[xmlrpc_redes] ProxyWAN {args.host}:{proxy.puerto} -> "
+              f"{args.destino[0]}:{args.destino[1]} {enlace!r}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(servir())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,26 @@
+import array
+import hashlib
+import inspect
+import itertools
+import os
+import re
+import signal
 import socket
-import threading
-from typing import Callable, Dict, Tuple, Any
+import time
+import traceback
+from collections.abc import Iterator
+from typing import Callable, Dict, Hashable, List, Optional, Tuple, Any, Union
 import xml.etree.ElementTree as ET
 
 from xmlrpc_redes import (
-    parsear_llamado_http, construir_respuesta_http,
-    parsear_llamado_xml, construir_respuesta_xml, construir_error_xml
+    construir_respuesta_http, construir_respuesta_http_partes,
+    ParserLlamado, construir_respuesta_xml, construir_error_xml, iterar_respuesta_xml, EscritorChunked,
+    conexion_persistente, Descompresor, elegir_codificacion, MIN_COMPRIMIR, NIVEL_COMPRESION,
+    LectorHTTP, ErrorHTTP
 )
+from pool_hilos import PoolHilos, ColaLlena
+from cache import CacheLRU, memoizar
+from buffers import recibir_completo, recibir_encabezado, recibir_cuerpo, enviar_partes
 
 ERROR_PARSEO_XML = 1
 ERROR_NO_EXISTE_METODO = 2
@@ -14,104 +28,509 @@ ERROR_EN_PARAMS = 3
 ERROR_INTERNO = 4
 OTRO_ERROR = 5
 
+# Solo se buscan en el cache de respuestas los cuerpos de hasta este tamaño;
+# los mas grandes se siguen parseando a medida que llegan
+MAX_CUERPO_CACHEABLE = 64 * 1024
+_NOMBRE_METODO = re.compile(rb"<methodName>\s*([^<]*?)\s*</methodName>")
+
+
+_SIN_ITEMS = object()
+
+
+def es_iterador(valor: Any) -> bool:
+    """Los métodos que devuelven un generador (o cualquier iterador) se
+    responden en pedazos con Transfer-Encoding: chunked."""
+    return isinstance(valor, Iterator)
+
+
+class FaultRPC(Exception):
+    """Error que se le responde al cliente como un <fault> XML-RPC."""
+
+    def __init__(self, codigo: int, mensaje: str):
+        super().__init__(mensaje)
+        self.codigo = codigo
+        self.mensaje = mensaje
+
+
 class Server:
-    def __init__(self, address: Tuple[str, int]):
+    def __init__(self, address: Tuple[str, int], timeout_inactividad: float = 15.0,
+                 max_llamados_por_conexion: int = 100, min_hilos: int = 4, max_hilos: int = 128,
+                 max_cola: int = 256, sobrecarga: str = "esperar",
+                 max_bytes_respuestas: int = 32 * 1024 * 1024, compresion: bool = True,
+                 min_comprimir: int = MIN_COMPRIMIR, nivel_compresion: int = NIVEL_COMPRESION,
+                 arreglos: bool = False, inactividad_hilos: float = 30.0):
         self.address = address
         self.methods: Dict[str, Callable[..., Any]] = {}
         self.sock = None
+        # Keep-alive: segundos que se espera el siguiente llamado en una conexion
+        # abierta y cantidad maxima de llamados atendidos por conexion
+        self.timeout_inactividad = timeout_inactividad
+        self.max_llamados_por_conexion = max_llamados_por_conexion
+        # Pool de hilos que atiende las conexiones aceptadas. Con la cola llena,
+        # sobrecarga="esperar" deja de aceptar hasta que haya lugar (los clientes
+        # esperan en el backlog del kernel) y "rechazar" responde un fault y cierra.
+        # Los hilos por encima de min_hilos terminan tras inactividad_hilos segundos ociosos
+        if sobrecarga not in ("esperar", "rechazar"):
+            raise ValueError("sobrecarga debe ser 'esperar' o 'rechazar'")
+        self.min_hilos = min_hilos
+        self.max_hilos = max_hilos
+        self.max_cola = max_cola
+        self.inactividad_hilos = inactividad_hilos
+        self.sobrecarga = sobrecarga
+        self.pool: Optional[PoolHilos] = None
+        # Cache de respuestas HTTP ya armadas para los métodos registrados con
+        # cache_respuesta=True (nombre -> ttl), acotado por el total de bytes
+        self.respuestas_cacheables: Dict[str, Optional[float]] = {}
+        self.cache_respuestas = CacheLRU(max_entradas=1 << 20, max_bytes=max_bytes_respuestas)
+        # Compresión gzip/deflate de las respuestas de al menos min_comprimir bytes
+        # cuando el cliente la acepta (los llamados comprimidos se aceptan siempre)
+        self.compresion = compresion
+        self.min_comprimir = min_comprimir
+        self.nivel_compresion = nivel_compresion
+        # Con arreglos=True los métodos reciben los arreglos de solo int o solo
+        # float como array.array en lugar de list
+        self.arreglos = arreglos
+        # Método estándar para agrupar varios llamados en un solo request
+        self.methods["system.multicall"] = self.system_multicall
+
+    def add_method(self, func: Callable[..., Any], cache: bool = False, max_entradas: int = 1024,
+                   ttl: Optional[float] = None, clave: Optional[Callable[..., Hashable]] = None,
+                   cache_respuesta: bool = False) -> None:
+        """Registra un procedimiento remoto. El nombre es func.__name__
+
+        Con cache=True (solo para funciones puras) los resultados se memorizan en
+        un CacheLRU de max_entradas, opcionalmente con vencimiento ttl en segundos,
+        usando como clave los parametros deserializados o clave(*params).
+
+        Con cache_respuesta=True se guarda la respuesta HTTP completa indexada por
+        un hash del cuerpo del llamado: un llamado identico byte a byte se responde
+        sin parsear ni ejecutar nada (tambien vence a los ttl segundos).
 
-    def add_method(self, func: Callable[..., Any]) -> None:
-        """Registra un procedimiento remoto. El nombre es func.__name__"""
+        Si func devuelve un generador el resultado se envia como un arreglo, de a
+        pedazos a medida que se produce (no admite cache=True; con cache=True un
+        iterador devuelto por una funcion comun se guarda y se envia como lista).
+        """
+        if cache and (inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)):
+            raise ValueError("cache=True no se puede usar con generadores")
+        if cache:
+            func = memoizar(func, CacheLRU(max_entradas, ttl), clave)
         self.methods[func.__name__] = func
+        if cache_respuesta:
+            self.respuestas_cacheables[func.__name__] = ttl
+        else:
+            self.respuestas_cacheables.pop(func.__name__, None)
+
+    def invalidar_cache(self, nombre: str, *params: Any) -> None:
+        """Borra del cache del método la entrada de params, o todo si no se pasan.
+
+        Si el método usa cache_respuesta se vacia el cache de respuestas entero:
+        sus claves son hashes de cuerpos y no se pueden ubicar por parametros.
+        """
+        func = self.methods.get(nombre)
+        crudo = nombre in self.respuestas_cacheables
+        if func is None or not (hasattr(func, "cache") or crudo):
+            raise KeyError(f"El método {nombre} no tiene cache")
+        if crudo:
+            self.cache_respuestas.limpiar()
+        if not hasattr(func, "cache"):
+            return
+        if params:
+            func.cache.invalidar(func.clave(*params))
+        else:
+            func.cache.limpiar()
+
+    def estadisticas_cache(self) -> Dict[str, Dict[str, Any]]:
+        """Hits, misses, entradas, desalojos y vencidos del cache de cada método
+        (y del cache de respuestas HTTP bajo "respuestas_http", si se usa)."""
+        stats = {
+            nombre: func.cache.estadisticas()
+            for nombre, func in self.methods.items() if hasattr(func, "cache")
+        }
+        if self.respuestas_cacheables:
+            stats["respuestas_http"] = self.cache_respuestas.estadisticas()
+        return stats
+
+    def serve(self, workers: int = 1) -> None:
+        """Atiende llamados indefinidamente.
 
-    def serve(self) -> None:
+        Con workers > 1 se hace pre-fork: se crean workers procesos que comparten
+        el puerto mediante SO_REUSEPORT (el kernel reparte las conexiones) y este
+        proceso queda como supervisor, reiniciando los workers que mueran. Así los
+        métodos que usan CPU aprovechan varios núcleos. Requiere os.fork (Unix).
+        """
+        if workers > 1:
+            self._supervisar(workers)
+        else:
+            self._servir(reuse_port=False)
+
+    def _servir(self, reuse_port: bool) -> None:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuse_port:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             s.bind(self.address)
             s.listen()
             self.sock = s
-            print(f"[xmlrpc_redes] Server escuchando en {self.address[0]}:{self.address[1]}")
+            self.pool = PoolHilos(self.min_hilos, self.max_hilos, self.max_cola, self.inactividad_hilos)
+            print(f"[xmlrpc_redes] Server escuchando en {self.address[0]}:{self.address[1]} (pid {os.getpid()})")
             while True:
                 conn, peer = s.accept()
-                th = threading.Thread(target=self.atender_cliente, args=(conn, peer), daemon=True)
-                th.start()
+                try:
+                    self.pool.enviar(self.atender_cliente, conn, peer, bloquear=self.sobrecarga == "esperar")
+                except ColaLlena:
+                    self.rechazar(conn)
+
+    def _supervisar(self, workers: int) -> None:
+        if not hasattr(os, "fork") or not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("El modo multi-proceso requiere os.fork y SO_REUSEPORT")
+        hijos: Dict[int, float] = {}  # pid -> momento de arranque
+
+        def lanzar() -> None:
+            pid = os.fork()
+            if pid == 0:
+                # Proceso worker: nunca vuelve al código del supervisor
+                codigo = 0
+                try:
+                    self._servir(reuse_port=True)
+                except KeyboardInterrupt:
+                    pass
+                except BaseException:
+                    traceback.print_exc()
+                    codigo = 1
+                finally:
+                    os._exit(codigo)
+            hijos[pid] = time.monotonic()
+
+        def terminar(signum, frame):
+            raise KeyboardInterrupt
+
+        signal.signal(signal.SIGTERM, terminar)
+        try:
+            for _ in range(workers):
+                lanzar()
+            print(f"[xmlrpc_redes] Supervisor (pid {os.getpid()}) con {workers} workers")
+            while True:
+                pid, estado = os.wait()
+                arranque = hijos.pop(pid, None)
+                if arranque is None:
+                    continue
+                print(f"[xmlrpc_redes] Worker {pid} terminó (estado {estado}), reiniciando")
+                # Si murió apenas arrancó (p. ej. puerto ocupado) se espera antes de
+                # reintentar para no entrar en un bucle de forks
+                if time.monotonic() - arranque < 1.0:
+                    time.sleep(1.0)
+                lanzar()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for pid in hijos:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            for pid in hijos:
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Contadores del pool de hilos: hilos, ociosos, profundidad de la cola,
+        encolados, rechazados, iniciados, completados y tiempos de espera en cola (segundos)."""
+        return self.pool.estadisticas() if self.pool is not None else {}
+
+    def rechazar(self, conn: socket.socket) -> None:
+        """Responde un fault de sobrecarga sin leer el llamado y cierra la conexion."""
+        try:
+            conn.settimeout(1.0)
+            self.error(conn, OTRO_ERROR, "Servidor sobrecargado, reintente más tarde")
+            conn.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        finally:
+            conn.close()
 
     def atender_cliente(self, conn: socket.socket, peer):
+        """Atiende llamados sobre la misma conexion hasta que el cliente pida
+        cerrarla, se alcance el limite de llamados o venza el timeout de inactividad."""
         try:
-            data = b""
-            while b"\r\n\r\n" not in data:
-                bytes_recv = conn.recv(4096)
-                if not bytes_recv:
-                    break
-                data += bytes_recv
-            if not data:
-                conn.close()
-                return
-
-            llamado, encabezados, cuerpo = parsear_llamado_http(data)
-            if not llamado:
-                self.error(conn, OTRO_ERROR, "Solicitud HTTP inválida")
-                return
-
-            # Validar método
-            if not llamado.startswith("POST "):
-                self.error(conn, OTRO_ERROR, "Solo se acepta HTTP POST")
-                return
-
-            user_agent = encabezados.get("user-agent")
-            host = encabezados.get("host")
-            content_type = encabezados.get("content-type")
-            content_length = encabezados.get("content-length")
-
-            # Cheque que existan los encabezados necesarios
-            if (user_agent is None) or (host is None) or (content_type is None) or (content_length is None):
-                self.error(conn, OTRO_ERROR, "Error en los encabezados HTTP")
-                return
-            if content_type != "text/xml":
-                self.error(conn, OTRO_ERROR, "Error en los encabezados HTTP")
-                return
-
-            content_length = int(content_length)
-            # Completar cuerpo según Content-Length si falta
-            while len(cuerpo) < content_length:
-                bytes_recv = conn.recv(4096)
-                if not bytes_recv:
-                    break
-                cuerpo += bytes_recv
-
-            cuerpo_xml = cuerpo.decode()
-
-            # Parsear XML-RPC
+            conn.settimeout(self.timeout_inactividad)
+            # El lector separa los llamados del flujo de bytes; lo que sobra de
+            # uno ya es el comienzo del siguiente (pipelining)
+            lector = LectorHTTP()
+            atendidos = 0
+            while True:
+                try:
+                    if not recibir_encabezado(conn, lector):
+                        return
+                except OSError:
+                    # Timeout de inactividad o conexion reseteada por el cliente
+                    return
+                except ErrorHTTP as e:
+                    self.error(conn, OTRO_ERROR, str(e))
+                    return
+
+                try:
+                    parser, descompresor, crudo = self.preparar_llamado(lector)
+                except FaultRPC as f:
+                    self.error(conn, f.codigo, f.mensaje)
+                    return
+
+                # Leer el cuerpo alimentando el parser a medida que llega
+                # (descomprimiendo si hace falta). Si puede estar en el cache de
+                # respuestas se junta entero para buscarlo antes de parsear
+                recibir = descompresor.alimentar if descompresor is not None else parser.alimentar
+                try:
+                    if crudo:
+                        # Cuerpo entero en un bytearray de Content-Length bytes
+                        completo = bytearray(lector.largo)
+                        recibidos = lector.leer_en(memoryview(completo))
+                        n = recibir_completo(conn, memoryview(completo)[recibidos:])
+                        lector.descontar(n)
+                        recibidos += n
+                    else:
+                        # Pedazos en el buffer del hilo, sin copias intermedias
+                        recibir_cuerpo(conn, lector, recibir)
+                    if descompresor is not None and lector.terminado:
+                        descompresor.terminar()
+                except OSError:
+                    return
+                except ValueError as e:
+                    # Chunk mal formado o cuerpo gzip/deflate corrupto
+                    self.error(conn, OTRO_ERROR, str(e))
+                    return
+
+                atendidos += 1
+                persistente, codificacion = self.terminar_llamado(lector, atendidos)
+                clave = None
+                if crudo:
+                    cuerpo = completo[:recibidos]
+                    clave, http = self.respuesta_cacheada(cuerpo, persistente, codificacion)
+                    if http is not None:
+                        conn.sendall(http)
+                        if not persistente:
+                            return
+                        continue
+                    parser.alimentar(cuerpo)
+
+                method, resp_xml = self.responder(parser)
+                if not isinstance(resp_xml, str):
+                    # Resultado generador: va en pedazos y no entra al cache de respuestas
+                    if not self.enviar_pedazos(conn, method, resp_xml, persistente, codificacion):
+                        return
+                    if not persistente:
+                        return
+                    continue
+                enviar_partes(conn, self.armar_respuesta(method, resp_xml, persistente, codificacion, clave))
+                if not persistente:
+                    return
+        finally:
+            conn.close()
+
+    def preparar_llamado(self, lector: LectorHTTP) -> Tuple[ParserLlamado, Optional[Descompresor], bool]:
+        """Valida el encabezado del llamado que tiene lector y arma el parser del
+        cuerpo y su descompresor (que alimenta al parser). El ultimo valor indica
+        si el cuerpo se junta entero porque puede estar en el cache de respuestas.
+        Lanza FaultRPC si el encabezado es invalido."""
+        encabezados = lector.encabezados
+        self.validar_http(lector.llamado, encabezados)
+        descompresor = self.descompresor(encabezados)
+        parser = ParserLlamado(self.arreglos)
+        if descompresor is not None:
+            descompresor.destino = parser.alimentar
+        crudo = (bool(self.respuestas_cacheables) and descompresor is None
+                 and lector.largo is not None and lector.largo <= MAX_CUERPO_CACHEABLE)
+        return parser, descompresor, crudo
+
+    def terminar_llamado(self, lector: LectorHTTP, atendidos: int) -> Tuple[bool, Optional[str]]:
+        """Con el cuerpo ya leido: si la conexion sigue abierta despues de responder
+        y con que codificacion se responde. Deja a lector en el llamado siguiente."""
+        persistente = (
+            conexion_persistente(lector.llamado, lector.encabezados)
+            and lector.terminado
+            and atendidos < self.max_llamados_por_conexion
+        )
+        codificacion = self.codificacion_respuesta(lector.encabezados)
+        lector.siguiente()
+        return persistente, codificacion
+
+    def respuesta_cacheada(self, cuerpo: bytes, persistente: bool, codificacion: Optional[str]
+                           ) -> Tuple[Optional[Tuple[str, Hashable]], Optional[bytes]]:
+        """(clave, respuesta HTTP del cache de respuestas o None); clave es la de
+        clave_respuesta, para guardar la respuesta con armar_respuesta."""
+        clave = self.clave_respuesta(cuerpo, persistente, codificacion)
+        if clave is None:
+            return None, None
+        encontrado, http = self.cache_respuestas.obtener(clave[1])
+        return clave, http if encontrado else None
+
+    def armar_respuesta(self, method: Optional[str], resp_xml: str, persistente: bool,
+                        codificacion: Optional[str], clave: Optional[Tuple[str, Hashable]]) -> List[bytes]:
+        """Respuesta HTTP de resp_xml; si vino de un llamado cacheable (y no es un
+        fault) se guarda en el cache de respuestas."""
+        partes = self.respuesta_http(resp_xml, persistente, codificacion)
+        if clave is not None and method == clave[0]:
+            self.cache_respuestas.guardar(clave[1], b"".join(partes), self.respuestas_cacheables.get(method))
+        return partes
+
+    def enviar_pedazos(self, conn: socket.socket, method: str, pedazos: Iterator,
+                       persistente: bool, codificacion: Optional[str]) -> bool:
+        """Envia una respuesta chunked a medida que se producen los pedazos.
+
+        Si el generador falla a mitad de camino ya no se puede responder un
+        fault: se devuelve False sin mandar el chunk final, se cierra la conexion
+        y el cliente ve una respuesta incompleta.
+        """
+        escritor = EscritorChunked(not persistente, codificacion, self.nivel_compresion)
+        partes = [escritor.encabezado()]
+        while True:
             try:
-                method, params = parsear_llamado_xml(cuerpo_xml)
-            except ET.ParseError:
-                self.error(conn, ERROR_PARSEO_XML, "Error parseo de XML")
-                return
+                xml = next(pedazos, None)
             except Exception as e:
-                self.error(conn, OTRO_ERROR, f"Solicitud XML-RPC inválida: {e}")
-                return
+                print(f"[xmlrpc_redes] Error en el resultado de {method}: {e}")
+                return False
+            if xml is None:
+                break
+            partes += escritor.pedazo(xml)
+            try:
+                enviar_partes(conn, partes)
+            except OSError:
+                # El cliente se fue: no tiene sentido seguir produciendo
+                return False
+            partes = []
+        enviar_partes(conn, partes + escritor.terminar())
+        return True
+
+    def descompresor(self, encabezados: Dict[str, str]) -> Optional[Descompresor]:
+        """Descompresor para el Content-Encoding del llamado (None si no viene comprimido)."""
+        codificacion = encabezados.get("content-encoding", "identity")
+        if codificacion.lower() == "identity":
+            return None
+        try:
+            return Descompresor(codificacion)
+        except ValueError as e:
+            raise FaultRPC(OTRO_ERROR, str(e))
+
+    def codificacion_respuesta(self, encabezados: Dict[str, str]) -> Optional[str]:
+        if not self.compresion:
+            return None
+        return elegir_codificacion(encabezados.get("accept-encoding"))
 
-            # Buscar método y ejecutar
-            func = self.methods.get(method)
-            if func is None:
-                self.error(conn, ERROR_NO_EXISTE_METODO, "No existe el método invocado")
-                return
+    def respuesta_http(self, resp_xml: str, persistente: bool, codificacion: Optional[str]) -> List[bytes]:
+        """Respuesta HTTP como [encabezado, cuerpo] (ver enviar_partes)."""
+        return construir_respuesta_http_partes(resp_xml, not persistente, codificacion,
+                                               self.min_comprimir, self.nivel_compresion)
 
+    def clave_respuesta(self, cuerpo: bytes, persistente: bool,
+                        codificacion: Optional[str] = None) -> Optional[Tuple[str, Hashable]]:
+        """Si el cuerpo invoca un método con cache_respuesta devuelve (método, clave)
+        para el cache de respuestas; si no, None. La clave incluye persistente y
+        la codificacion porque cambian los bytes de la respuesta."""
+        m = _NOMBRE_METODO.search(cuerpo, 0, 1024)
+        if m is None:
+            return None
+        method = m.group(1).decode("utf-8", "replace")
+        if method not in self.respuestas_cacheables:
+            return None
+        digest = hashlib.blake2b(m.group(1), digest_size=16)
+        digest.update(cuerpo)
+        return method, (digest.digest(), persistente, codificacion)
+
+    def validar_http(self, llamado: str, encabezados: Dict[str, str]) -> None:
+        """Valida la linea de llamado y los encabezados HTTP. El largo del cuerpo
+        (Content-Length o chunked) ya lo valido y lo lleva LectorHTTP."""
+        if not llamado:
+            raise FaultRPC(OTRO_ERROR, "Solicitud HTTP inválida")
+
+        # Validar método
+        if not llamado.startswith("POST "):
+            raise FaultRPC(OTRO_ERROR, "Solo se acepta HTTP POST")
+
+        user_agent = encabezados.get("user-agent")
+        host = encabezados.get("host")
+        content_type = encabezados.get("content-type")
+        delimitado = "content-length" in encabezados or "transfer-encoding" in encabezados
+
+        # Cheque que existan los encabezados necesarios
+        if (user_agent is None) or (host is None) or (content_type is None) or not delimitado:
+            raise FaultRPC(OTRO_ERROR, "Error en los encabezados HTTP")
+        if content_type != "text/xml":
+            raise FaultRPC(OTRO_ERROR, "Error en los encabezados HTTP")
+
+    def responder(self, parser: ParserLlamado) -> Tuple[Optional[str], Union[str, Iterator]]:
+        """Devuelve (método, respuesta XML); método es None si se respondio un fault.
+        Si el método devolvio un generador la respuesta es un iterador de pedazos
+        del XML (ver enviar_pedazos)."""
+        try:
+            method, params = self.leer_llamado(parser)
+            func = self.buscar_metodo(method)
+            res = self.ejecutar(func, params)
+            if es_iterador(res):
+                # El primer item se pide aca: un error al arrancar el generador
+                # todavia se puede responder como fault
+                primero = self.ejecutar(next, [res, _SIN_ITEMS])
+                if primero is _SIN_ITEMS:
+                    return method, construir_respuesta_xml([])
+                return method, iterar_respuesta_xml(itertools.chain([primero], res))
+        except FaultRPC as f:
+            return None, construir_error_xml(f.codigo, f.mensaje)
+        # Construir respuesta
+        return method, construir_respuesta_xml(res)
+
+    def leer_llamado(self, parser: ParserLlamado) -> Tuple[str, List[Any]]:
+        try:
+            return parser.resultado()
+        except ET.ParseError:
+            raise FaultRPC(ERROR_PARSEO_XML, "Error parseo de XML")
+        except Exception as e:
+            raise FaultRPC(OTRO_ERROR, f"Solicitud XML-RPC inválida: {e}")
+
+    def buscar_metodo(self, method: str) -> Callable[..., Any]:
+        func = self.methods.get(method)
+        if func is None:
+            raise FaultRPC(ERROR_NO_EXISTE_METODO, "No existe el método invocado")
+        return func
+
+    def ejecutar(self, func: Callable[..., Any], params: List[Any]) -> Any:
+        try:
+            return func(*params)
+        except TypeError as e:
+            raise FaultRPC(ERROR_EN_PARAMS, f"Error en parámetros del método invocado: {e}")
+        except Exception as e:
+            raise FaultRPC(ERROR_INTERNO, f"Error interno en la ejecución del método: {e}")
+
+    def system_multicall(self, llamados: List[Any]) -> List[Any]:
+        """Ejecuta una lista de {"methodName": ..., "params": [...]} y devuelve, en
+        el mismo orden, [resultado] por cada llamado exitoso o un struct
+        {"faultCode", "faultString"} por cada uno que falló (no es todo o nada)."""
+        if not isinstance(llamados, list):
+            raise TypeError("system.multicall espera un array de llamados")
+        resultados: List[Any] = []
+        for llamado in llamados:
             try:
-                res = func(*params)
-            except TypeError as e:
-                self.error(conn, ERROR_EN_PARAMS, f"Error en parámetros del método invocado: {e}")
-                return
-            except Exception as e:
-                self.error(conn, ERROR_INTERNO, f"Error interno en la ejecución del método: {e}")
-                return
+                method, params = self.leer_llamado_multicall(llamado)
+                res = self.ejecutar(self.buscar_metodo(method), params)
+                if es_iterador(res):
+                    res = self.ejecutar(list, [res])
+                resultados.append([res])
+            except FaultRPC as f:
+                resultados.append({"faultCode": f.codigo, "faultString": f.mensaje})
+        return resultados
 
-            # Construir respuesta
-            resp_xml = construir_respuesta_xml(res)
-            conn.sendall(construir_respuesta_http(resp_xml))
-        finally:
-            conn.close()
+    @staticmethod
+    def leer_llamado_multicall(llamado: Any) -> Tuple[str, List[Any]]:
+        if not isinstance(llamado, dict) or not isinstance(llamado.get("methodName"), str):
+            raise FaultRPC(OTRO_ERROR, "Llamado inválido dentro de system.multicall")
+        method = llamado["methodName"]
+        if method == "system.multicall":
+            raise FaultRPC(OTRO_ERROR, "No se permite system.multicall recursivo")
+        params = llamado.get("params", [])
+        # Con arreglos=True unos params de solo int o solo float llegan como array.array
+        if not isinstance(params, (list, array.array)):
+            raise FaultRPC(ERROR_EN_PARAMS, "Los params de un llamado deben ser un array")
+        return method, list(params)
 
     def error(self, conn: socket.socket, num_err: int, mensaje_err: str):
+        """Responde un fault y marca la conexion para cerrarse (errores de protocolo)."""
         resp_xml = construir_error_xml(num_err, mensaje_err)
         conn.sendall(construir_respuesta_http(resp_xml))
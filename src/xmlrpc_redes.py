@@ -1,6 +1,11 @@
+import array
+import binascii
+import re
 import xml.etree.ElementTree as ET
+import zlib
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from xml.parsers import expat
 
 # IMPORTANTE Documentar todas las funciones en el archivo de documentacion
 # explicar que hace cada funcion y dar ejemplos de uso
@@ -46,6 +51,20 @@ sirven para convertir entre tipos de Python y XML-RPC, por ejemplo:
 para serializar un int, se crea un elemento <value><int>...</int></value>
 para deserializar, se recibe un elemento <value> y se devuelve el int
 
+bytes, bytearray y memoryview se envian como <base64> y se reciben como bytes
+
+los arreglos numericos se codifican y decodifican en lote: una lista larga de
+solo int o solo float (o un array.array, o un ndarray de NumPy) se escribe con
+un solo join, y al recibir esos bloques se convierten con split + map antes de
+que los vea el parser XML. Con arreglos=True (parsear_*_xml, ParserLlamado,
+Server, Client) los arreglos de solo int o solo float se reciben como
+array.array ('q' o 'd') en lugar de list
+
+los resultados que se producen de a items (generadores) se responden con
+iterar_respuesta_xml: el <array> se arma de a pedazos de unos 16 KB que el
+servidor manda con Transfer-Encoding: chunked (EscritorChunked) a medida que
+salen, y el cliente los va parseando con ParserRespuesta
+
 ---------------------------------------------------------------------
 
 3. construir_llamado_xml(method: str, params: List[Any]) -> str
@@ -65,12 +84,20 @@ construir_llamado_xml("suma", [5,7]) devuelve el string XML:
 
 esta funcion es usada por el cliente para enviar llamadas al servidor,
 
+las funciones construir_* no arman un arbol ElementTree: escriben el texto XML
+directamente (_escribir_valor) con el mismo resultado que ET.tostring sobre
+serializacion(), pero mucho mas rapido y con menos memoria para valores grandes
+
 4. parsear_llamado_xml(xml: str) -> Tuple[str, List[Any]]
 
 esta es usada por el servidor para recibir llamadas del cliente,
 devuelve el nombre del método y la lista de parámetros
 por ejemplo, parsear_llamado_xml(...) del XML anterior devuelve ("suma", [5, 7])
 
+para recibir el cuerpo de a pedazos el servidor usa la clase ParserLlamado:
+p = ParserLlamado(); p.alimentar(pedazo) por cada recv; p.resultado() al final
+devuelve lo mismo que parsear_llamado_xml, sin guardar el cuerpo entero
+
 ---------------------------------------------------------------
 
 5. construir_respuesta_xml(res: Any) -> str
@@ -123,7 +150,7 @@ Http
 son usadas tanto por el cliente como por el servidor para manejar la capa HTTP
 estas funciones construyen y parsean llamadas y respuestas HTTP/1.1
 
-1. construir_llamado_http(host: str, data: str) -> bytes
+1. construir_llamado_http(host: str, data: str, keep_alive: bool = False) -> bytes
 
 esta se usa tanto por el cliente como por el servidor para construir llamadas y respuestas HTTP
 por ejemplo, construir_llamado_http("localhost:8000", "<xml>...</xml>") devuelve:
@@ -134,6 +161,10 @@ User-Agent: xmlrpc_redes/1.0\r\nContent-Type: text/xml\r\n
 Content-Length: 15\r\n
 Connection: close\r\n\r\n<xml>...</xml>"
 
+con keep_alive=True se pide "Connection: keep-alive" para reutilizar el socket
+con compresion=True se agrega "Accept-Encoding: gzip, deflate" y, si el cuerpo
+tiene al menos min_comprimir bytes, se manda comprimido con gzip
+
 
 2. parsear_llamado_http(resp: bytes) -> Tuple[str, Dict[str, str], bytes]
 
@@ -146,7 +177,7 @@ esta funcion separa las 3 partes que nos interesan de una llamada o respuesta HT
 - el cuerpo (cuerpo)
 
 
-3. construir_respuesta_http(data: str) -> bytes
+3. construir_respuesta_http(data: str, cerrar: bool = True) -> bytes
 
 tambien se usa tanto por el cliente como por el servidor para construir respuestas HTTP
 por ejemplo, construir_respuesta_http("<xml>...</xml>") devuelve:
@@ -155,6 +186,15 @@ Content-Length: 15\r\n
 Connection: close\r\n\r\n
 <xml>...</xml>"
 
+con cerrar=False se envia "Connection: keep-alive" y el servidor deja el socket
+abierto para el siguiente llamado
+
+construir_llamado_http_partes y construir_respuesta_http_partes devuelven lo
+mismo como lista [encabezado, cuerpo]: se envian con sendmsg (buffers.enviar_partes)
+sin copiar el cuerpo para anteponerle el encabezado
+con codificacion="gzip" o "deflate" el cuerpo se comprime (si supera min_comprimir)
+y se agrega Content-Encoding
+
 
 4. parsear_respuesta_http(resp: bytes) -> Tuple[str, Dict[str, str], bytes]
 
@@ -162,6 +202,36 @@ mas de lo mismo, esta se usa tanto por el cliente como por el servidor para pars
 devuelve una tupla (llamado, encabezados, cuerpo) igual que parsear_llamado_http
 
 
+5. conexion_persistente(llamado: str, encabezados: Dict[str, str]) -> bool
+
+decide si la conexion se puede reutilizar segun la version HTTP y el encabezado
+Connection, por ejemplo conexion_persistente("POST / HTTP/1.1", {}) devuelve True
+y conexion_persistente("POST / HTTP/1.1", {"connection": "close"}) devuelve False
+
+
+6. elegir_codificacion(accept_encoding: str) -> Optional[str]
+
+elige "gzip" o "deflate" segun el Accept-Encoding recibido, o None, por ejemplo
+elegir_codificacion("gzip;q=0, deflate") devuelve "deflate"
+
+
+7. comprimir(data, codificacion, nivel) / descomprimir(data, codificacion) -> bytes
+
+comprimen y descomprimen un cuerpo completo; para descomprimir a medida que
+llega el cuerpo se usa Descompresor(codificacion, destino), que le pasa a
+destino (p. ej. ParserLlamado.alimentar) pedazos de a lo sumo 64 KB
+
+
+8. LectorHTTP(respuesta=False)
+
+maquina de estados que separa mensajes HTTP de un flujo de bytes que llega de a
+pedazos (la usan el servidor para los llamados y el cliente para las respuestas):
+lector.alimentar(pedazo); lector.encabezado() -> True cuando esta el encabezado
+completo (lector.llamado, lector.encabezados); lector.cuerpo() -> pedazos del
+cuerpo, hasta lector.terminado; lector.siguiente() para el proximo mensaje.
+Lanza ErrorHTTP si el encabezado supera los limites o el framing es invalido
+
+
 
 """
 
@@ -176,10 +246,10 @@ def serializacion(valor: Any) -> ET.Element:
         e.text = "1" if valor else "0"
     elif isinstance(valor, int):
         e = ET.SubElement(v, "int")
-        e.text = str(valor)
+        e.text = int.__repr__(valor)
     elif isinstance(valor, float):
         e = ET.SubElement(v, "double")
-        e.text = repr(valor)
+        e.text = float.__repr__(valor)
     elif isinstance(valor, str):
         e = ET.SubElement(v, "string")
         e.text = valor
@@ -198,12 +268,132 @@ def serializacion(valor: Any) -> ET.Element:
     elif isinstance(valor, datetime):
         e = ET.SubElement(v, "dateTime.iso8601")
         e.text = valor.strftime("%Y%m%dT%H:%M:%S")
+    elif isinstance(valor, (bytes, bytearray, memoryview)):
+        e = ET.SubElement(v, "base64")
+        e.text = _a_base64(valor)
+    elif _es_arreglo(valor):
+        # tolist() da una lista, o un escalar de Python si es un escalar de NumPy
+        return serializacion(_como_lista(valor))
     else:
         e = ET.SubElement(v, "string")
         e.text = str(valor)
     return v
 
-def deserializacion(elem: ET.Element) -> Any:
+def _a_base64(valor: Union[bytes, bytearray, memoryview]) -> str:
+    """Codifica directo desde el buffer (sin copiarlo a bytes antes)."""
+    if isinstance(valor, memoryview) and not valor.c_contiguous:
+        valor = valor.tobytes()
+    return binascii.b2a_base64(valor, newline=False).decode("ascii")
+
+# Escritura directa de XML (sin armar un arbol ElementTree). Produce exactamente
+# el mismo texto que ET.tostring sobre el arbol de serializacion(): mismo escape
+# de &, < y > y la forma corta <tag /> para los elementos vacios.
+
+def _escapar(texto: str) -> str:
+    if "&" in texto:
+        texto = texto.replace("&", "&amp;")
+    if "<" in texto:
+        texto = texto.replace("<", "&lt;")
+    if ">" in texto:
+        texto = texto.replace(">", "&gt;")
+    return texto
+
+def _escribir_texto(tag: str, texto: str, partes: List[str]) -> None:
+    if texto:
+        partes.append(f"<{tag}>{_escapar(texto)}</{tag}>")
+    else:
+        partes.append(f"<{tag} />")
+
+def _escribir_valor(valor: Any, partes: List[str]) -> None:
+    """Agrega a partes el <value> de valor, igual que serializacion() + ET.tostring."""
+    if isinstance(valor, bool):
+        partes.append("<value><boolean>1</boolean></value>" if valor else "<value><boolean>0</boolean></value>")
+    elif isinstance(valor, int):
+        # int.__repr__ y float.__repr__: las subclases (IntEnum, numpy.float64)
+        # pueden redefinir str y repr y dejar un texto que no es un numero
+        partes.append(f"<value><int>{int.__repr__(valor)}</int></value>")
+    elif isinstance(valor, float):
+        partes.append(f"<value><double>{float.__repr__(valor)}</double></value>")
+    elif isinstance(valor, str):
+        if valor:
+            partes.append(f"<value><string>{_escapar(valor)}</string></value>")
+        else:
+            partes.append("<value><string /></value>")
+    elif isinstance(valor, (list, tuple)):
+        if valor:
+            partes.append("<value><array><data>")
+            if len(valor) < MIN_LOTE or not _escribir_lote(valor, partes):
+                for item in valor:
+                    _escribir_valor(item, partes)
+            partes.append("</data></array></value>")
+        else:
+            partes.append("<value><array><data /></array></value>")
+    elif isinstance(valor, dict):
+        if valor:
+            partes.append("<value><struct>")
+            for k, val in valor.items():
+                partes.append("<member>")
+                _escribir_texto("name", str(k), partes)
+                _escribir_valor(val, partes)
+                partes.append("</member>")
+            partes.append("</struct></value>")
+        else:
+            partes.append("<value><struct /></value>")
+    elif isinstance(valor, datetime):
+        partes.append(f"<value><dateTime.iso8601>{valor.strftime('%Y%m%dT%H:%M:%S')}</dateTime.iso8601></value>")
+    elif isinstance(valor, (bytes, bytearray, memoryview)):
+        # El alfabeto base64 no necesita escape
+        if len(valor):
+            partes.append(f"<value><base64>{_a_base64(valor)}</base64></value>")
+        else:
+            partes.append("<value><base64 /></value>")
+    elif _es_arreglo(valor):
+        _escribir_valor(_como_lista(valor), partes)
+    else:
+        partes.append("<value>")
+        _escribir_texto("string", str(valor), partes)
+        partes.append("</value>")
+
+# Arreglos numericos: una lista (o tupla) larga de solo int o solo float se
+# escribe de una vez con join, sin pasar elemento por elemento por
+# _escribir_valor. array.array y los ndarray de NumPy se convierten con tolist().
+# Del lado que recibe, _ExtractorLotes decodifica esos mismos bloques en lote.
+
+MIN_LOTE = 16
+
+_SEP_INT = "</int></value><value><int>"
+_SEP_DOUBLE = "</double></value><value><double>"
+
+def _escribir_lote(valor: Union[list, tuple], partes: List[str]) -> bool:
+    """Escribe los <value> de los elementos de valor de una sola vez si es
+    homogeneo (int o float exactos; bool no cuenta como int). Devuelve False si
+    hay que escribirlos uno por uno."""
+    tipos = set(map(type, valor))
+    if tipos == {int}:
+        partes.append("<value><int>")
+        partes.append(_SEP_INT.join(map(str, valor)))
+        partes.append("</int></value>")
+    elif tipos == {float}:
+        partes.append("<value><double>")
+        partes.append(_SEP_DOUBLE.join(map(repr, valor)))
+        partes.append("</double></value>")
+    else:
+        return False
+    return True
+
+def _es_arreglo(valor: Any) -> bool:
+    # NumPy se reconoce por el modulo del tipo, sin importarlo
+    return isinstance(valor, array.array) or (
+        type(valor).__module__ == "numpy" and hasattr(valor, "tolist"))
+
+def _como_lista(valor: Any) -> Any:
+    return valor.tolist() if _es_arreglo(valor) else valor
+
+def deserializacion(elem: ET.Element, lotes: Optional[Dict[str, list]] = None,
+                    arreglos: bool = False) -> Any:
+    """lotes son los arreglos que _ExtractorLotes saco del documento; con
+    arreglos=True los arreglos de solo int o solo float se devuelven como
+    array.array."""
     if elem is None:
         return None
     if len(elem) == 0:
@@ -230,34 +420,49 @@ def deserializacion(elem: ET.Element) -> Any:
             return datetime.strptime(valor.strip(), "%Y%m%dT%H:%M:%S")
         except:
             return valor
+    if tag == "base64":
+        # a2b_base64 acepta el str ASCII directamente e ignora saltos de linea
+        return binascii.a2b_base64(valor)
     if tag == "array":
         data = child.find("data")
         items = []
-        if data is not None:
+        if data is not None and lotes:
+            for val in data:
+                if val.tag == "value":
+                    items.append(deserializacion(val, lotes, arreglos))
+                elif val.tag == _LOTE:
+                    items.extend(lotes.pop(val.get("n"), ()))
+        elif data is not None:
             for val in data.findall("value"):
-                items.append(deserializacion(val))
-        return items
+                items.append(deserializacion(val, lotes, arreglos))
+        return _a_arreglo(items) if arreglos else items
     if tag == "struct":
         obj = {}
         for member in child.findall("member"):
             nom_el = member.find("name")
             val_el = member.find("value")
             nom = nom_el.text if nom_el is not None else ""
-            obj[nom] = deserializacion(val_el)
+            obj[nom] = deserializacion(val_el, lotes, arreglos)
         return obj
     return valor
 
 def construir_llamado_xml(method: str, params: List[Any]) -> str:
-    elem = ET.Element("methodCall")
-    mnom = ET.SubElement(elem, "methodName")
-    mnom.text = method
-    params_el = ET.SubElement(elem, "params")
-    for p in params:
-        param = ET.SubElement(params_el, "param")
-        param.append(serializacion(p))
-    return '<?xml version="1.0"?>' + ET.tostring(elem, encoding="unicode")
-
-def parsear_llamado_xml(xml: str) -> Tuple[str, List[Any]]:
+    partes = ['<?xml version="1.0"?><methodCall>']
+    _escribir_texto("methodName", method, partes)
+    if params:
+        partes.append("<params>")
+        for p in params:
+            partes.append("<param>")
+            _escribir_valor(p, partes)
+            partes.append("</param>")
+        partes.append("</params>")
+    else:
+        partes.append("<params />")
+    partes.append("</methodCall>")
+    return "".join(partes)
+
+def parsear_llamado_xml(xml: Union[str, bytes], arreglos: bool = False) -> Tuple[str, List[Any]]:
+    xml, lotes = _extraer_lotes(xml)
     elem = ET.fromstring(xml)
     if elem.tag != "methodCall":
         raise ValueError("XML-RPC: método inválido")
@@ -268,33 +473,150 @@ def parsear_llamado_xml(xml: str) -> Tuple[str, List[Any]]:
     params: List[Any] = []
     for p in elem.findall("./params/param"):
         val = p.find("value")
-        params.append(deserializacion(val))
+        params.append(deserializacion(val, lotes, arreglos))
     return method, params
 
+class ParserLlamado:
+    """Parser incremental de <methodCall>.
+
+    Se alimenta con los bytes del cuerpo a medida que llegan del socket
+    (alimentar); el DecodificadorXMLRPC va armando los parametros con cada
+    evento, asi el parseo se solapa con la recepcion y nunca se guarda el
+    cuerpo completo ni su version decodificada. Con arreglos=True los arreglos
+    de solo int o solo float llegan como array.array. resultado() devuelve
+    (method, params) igual que parsear_llamado_xml o lanza el error encontrado
+    (ET.ParseError si el XML esta mal formado o incompleto, ValueError si no es
+    un methodCall valido).
+    """
+
+    def __init__(self, arreglos: bool = False):
+        self._dec = DecodificadorXMLRPC(arreglos)
+        self.error: Optional[Exception] = None
+
+    def alimentar(self, data: bytes) -> None:
+        # Los errores se guardan y se ignora el resto del cuerpo, que igual hay
+        # que terminar de leer del socket para no romper el keep-alive
+        if self.error is not None:
+            return
+        try:
+            self._dec.alimentar(data)
+        except Exception as e:
+            self.error = e
+
+    def resultado(self) -> Tuple[str, List[Any]]:
+        return _llamado_desde_raiz(self._raiz())
+
+    def _raiz(self) -> Tuple[str, Any]:
+        if self.error is None:
+            try:
+                self._dec.alimentar(b"", final=True)
+            except Exception as e:
+                self.error = e
+        if self.error is not None:
+            raise self.error
+        return self._dec.raiz
+
+class ParserRespuesta(ParserLlamado):
+    """Como ParserLlamado pero para <methodResponse>: resultado() devuelve
+    (ok, valor) igual que parsear_respuesta_xml. Lo usan los clientes para
+    decodificar una respuesta chunked a medida que llega."""
+
+    def resultado(self) -> Tuple[bool, Any]:
+        return _respuesta_desde_raiz(self._raiz())
+
 def construir_respuesta_xml(res: Any) -> str:
-    elem = ET.Element("methodResponse")
-    params = ET.SubElement(elem, "params")
-    param = ET.SubElement(params, "param")
-    param.append(serializacion(res))
-    return '<?xml version="1.0"?>' + ET.tostring(elem, encoding="unicode")
+    partes = ['<?xml version="1.0"?><methodResponse><params><param>']
+    _escribir_valor(res, partes)
+    partes.append("</param></params></methodResponse>")
+    return "".join(partes)
+
+# Resultados que se producen de a items (generadores): el <methodResponse> se
+# arma y se envia de a pedazos, sin tener nunca el arreglo entero en memoria
+
+TAM_PEDAZO_XML = 16 * 1024
+
+_INICIO_ARREGLO = '<?xml version="1.0"?><methodResponse><params><param><value><array><data>'
+_FIN_ARREGLO = "</data></array></value></param></params></methodResponse>"
+
+class RespuestaEnPedazos:
+    """<methodResponse> de un arreglo que se va produciendo de a items.
+
+    agregar(item) devuelve un pedazo de XML cada vez que se juntan al menos tam
+    caracteres ("" mientras tanto), vaciar() devuelve lo pendiente y terminar()
+    el ultimo pedazo. Unidos dan lo mismo que construir_respuesta_xml(items)
+    (con <data></data> en lugar de <data /> si no hubo items).
+
+    Los items se codifican de a grupos de mas o menos un pedazo, asi los
+    numeros usan el mismo camino rapido que una lista (_escribir_lote).
+    """
+
+    def __init__(self, tam: int = TAM_PEDAZO_XML):
+        self.tam = tam
+        self._partes = [_INICIO_ARREGLO]
+        self._largo = len(_INICIO_ARREGLO)
+        self._items: List[Any] = []
+        self._por_grupo = MIN_LOTE
+
+    def agregar(self, item: Any) -> str:
+        self._items.append(item)
+        if len(self._items) < self._por_grupo:
+            return ""
+        self._escribir()
+        return self.vaciar() if self._largo >= self.tam else ""
+
+    def _escribir(self) -> None:
+        items, self._items = self._items, []
+        n = len(self._partes)
+        if len(items) < MIN_LOTE or not _escribir_lote(items, self._partes):
+            for item in items:
+                _escribir_valor(item, self._partes)
+        largo = sum(map(len, self._partes[n:]))
+        self._largo += largo
+        # Cuantos items entran en un pedazo, segun lo que ocuparon estos
+        self._por_grupo = max(MIN_LOTE, self.tam * len(items) // max(largo, 1))
+
+    def vaciar(self) -> str:
+        if self._items:
+            self._escribir()
+        pedazo = "".join(self._partes)
+        self._partes = []
+        self._largo = 0
+        return pedazo
+
+    def terminar(self) -> str:
+        if self._items:
+            self._escribir()
+        self._partes.append(_FIN_ARREGLO)
+        return self.vaciar()
+
+def iterar_respuesta_xml(items: Iterable[Any], tam: int = TAM_PEDAZO_XML) -> Iterator[str]:
+    """Pedazos de la respuesta de un resultado iterable: el primero apenas esta
+    el primer item (asi el cliente recibe algo enseguida) y despues de a unos
+    tam caracteres."""
+    respuesta = RespuestaEnPedazos(tam)
+    items = iter(items)
+    for item in items:
+        yield respuesta.agregar(item) or respuesta.vaciar()
+        break
+    for item in items:
+        pedazo = respuesta.agregar(item)
+        if pedazo:
+            yield pedazo
+    yield respuesta.terminar()
 
 def construir_error_xml(num_err: int, mensaje_err: str) -> str:
-    elem = ET.Element("methodResponse")
-    fault = ET.SubElement(elem, "fault")
-    value = ET.SubElement(fault, "value")
-    struct = ET.SubElement(value, "struct")
-
-    m1 = ET.SubElement(struct, "member")
-    n1 = ET.SubElement(m1, "name"); n1.text = "faultCode"
-    m1.append(serializacion(int(num_err)))
-
-    m2 = ET.SubElement(struct, "member")
-    n2 = ET.SubElement(m2, "name"); n2.text = "faultString"
-    m2.append(serializacion(str(mensaje_err)))
-
-    return '<?xml version="1.0"?>' + ET.tostring(elem, encoding="unicode")
-
-def parsear_respuesta_xml(xml_text: str) -> Tuple[bool, Any]:
+    partes = [
+        '<?xml version="1.0"?><methodResponse><fault><value><struct>'
+        '<member><name>faultCode</name>'
+    ]
+    _escribir_valor(int(num_err), partes)
+    partes.append("</member><member><name>faultString</name>")
+    _escribir_valor(str(mensaje_err), partes)
+    partes.append("</member></struct></value></fault></methodResponse>")
+    return "".join(partes)
+
+def parsear_respuesta_xml(xml_text: Union[str, bytes], arreglos: bool = False) -> Tuple[bool, Any]:
+    xml_text, lotes = _extraer_lotes(xml_text)
     root = ET.fromstring(xml_text)
     if root.tag != "methodResponse":
         raise ValueError("XML-RPC: respuesta inválida")
@@ -307,29 +629,476 @@ def parsear_respuesta_xml(xml_text: str) -> Tuple[bool, Any]:
                 name_el = member.find("name")
                 val_el = member.find("value")
                 key = name_el.text if name_el is not None else ""
-                fault_obj[key] = deserializacion(val_el)
+                fault_obj[key] = deserializacion(val_el, lotes, arreglos)
         return False, fault_obj
     # ok
     val_el = root.find("./params/param/value")
-    return True, deserializacion(val_el)
+    return True, deserializacion(val_el, lotes, arreglos)
+
+# -----------------------------
+# Lotes numericos
+# -----------------------------
+
+# Antes de parsear, los bloques de MIN_LOTE o mas <value><int> (o <double>)
+# seguidos se decodifican de una vez sobre los bytes (split + map) y en el XML
+# quedan reemplazados por un solo <lote.xmlrpc n="..."/>, que deserializacion()
+# y el DecodificadorXMLRPC cambian por los valores. Fuera de comentarios, CDATA
+# e instrucciones de procesamiento un "<value>" siempre es un tag, por eso ante
+# "<!" o "<?" (salvo la declaracion inicial) se deja de extraer.
+
+_LOTE = "lote.xmlrpc"
+_TEXTO_LOTE = rb"[^<&\x80-\xff]*"
+# Una sola pasada busca los lotes y lo que obliga a dejar de extraer ("<!",
+# "<?" o un "<lote.xmlrpc" que ya venga en el documento). Todas las
+# alternativas empiezan con "<", que re busca como literal.
+_RE_LOTE = re.compile(
+    rb"<(?:value><(?:int>%s</int></value>(?:<value><int>%s</int></value>){%d,}"
+    rb"|double>%s</double></value>(?:<value><double>%s</double></value>){%d,})"
+    rb"|[!?]|%s)"
+    % (_TEXTO_LOTE, _TEXTO_LOTE, MIN_LOTE - 1, _TEXTO_LOTE, _TEXTO_LOTE, MIN_LOTE - 1,
+       re.escape(_LOTE.encode())))
+_RE_PROHIBIDO = re.compile(rb"<(?:[!?]|%s)" % re.escape(_LOTE.encode()))
+_SEPS_BYTES = (_SEP_INT.encode(), _SEP_DOUBLE.encode())
+# "in" no busca subsecuencias en un memoryview; re si, sin copiarlo
+_BUSCAR_SEPS = tuple(re.compile(re.escape(sep)).search for sep in _SEPS_BYTES)
+# Lo que ocupa el lote mas corto posible (<value><int></int></value> x MIN_LOTE)
+_MIN_BYTES_LOTE = 26 * MIN_LOTE
+
+def _decodificar_lote(bloque: bytes) -> list:
+    if bloque[8:11] == b"int":
+        piezas = bloque[12:-14].split(_SEPS_BYTES[0])
+        rapido, lento = int, _a_int
+    else:
+        piezas = bloque[15:-17].split(_SEPS_BYTES[1])
+        rapido, lento = float, _a_float
+    try:
+        return list(map(rapido, piezas))
+    except ValueError:
+        # Algun texto invalido: mismo resultado que elemento por elemento
+        return [lento(p.decode("ascii")) for p in piezas]
+
+def _a_arreglo(items: list) -> Union[list, array.array]:
+    tipos = set(map(type, items))
+    if tipos == {float}:
+        return array.array("d", items)
+    if tipos == {int}:
+        try:
+            return array.array("q", items)
+        except OverflowError:
+            pass
+    return items
+
+class _ExtractorLotes:
+    """Saca los lotes numericos de un documento que llega entero o de a pedazos.
+
+    procesar() devuelve el pedazo con los lotes reemplazados; los valores
+    quedan en lotes[n] hasta que el decodificador los consume.
+    """
+
+    def __init__(self):
+        self.lotes: Dict[str, list] = {}
+        self.activo = True
+        self._n = 0
+        self._primero = True
+        self._cola = b""
+
+    def procesar(self, data: Union[str, bytes, bytearray, memoryview]) -> Union[str, bytes, bytearray, memoryview]:
+        if not self.activo or not data:
+            return data
+        # Un str se procesa como UTF-8 y se devuelve como str (ET y expat
+        # ignoran el encoding declarado cuando reciben str)
+        es_str = isinstance(data, str)
+        texto = data.encode("utf-8") if es_str else bytes(data)
+        desde = 0
+        if self._primero:
+            self._primero = False
+            if texto.startswith(b"<?xml"):
+                desde = texto.find(b"?>") + 2
+                if desde < 2:
+                    self.activo = False
+                    return data
+        # Un prohibido puede quedar partido entre el pedazo anterior y este
+        if self._cola and _RE_PROHIBIDO.search(self._cola + texto[:len(_LOTE)]):
+            self.activo = False
+            return data
+        self._cola = (self._cola + texto)[-len(_LOTE):] if len(texto) < len(_LOTE) else texto[-len(_LOTE):]
+        if len(texto) < _MIN_BYTES_LOTE:
+            # No entra un lote: solo hay que ver si aparece un prohibido
+            if _RE_PROHIBIDO.search(texto, desde):
+                self.activo = False
+            return data
+        lotes = {}
+        partes = []
+        pos = 0
+        for m in _RE_LOTE.finditer(texto, desde):
+            bloque = m.group()
+            if not bloque.startswith(b"<value>"):
+                self.activo = False
+                return data
+            n = str(self._n + len(lotes))
+            lotes[n] = _decodificar_lote(bloque)
+            partes.append(texto[pos:m.start()])
+            partes.append(b'<%s n="%s"/>' % (_LOTE.encode(), n.encode()))
+            pos = m.end()
+        if not partes:
+            return data
+        self.lotes.update(lotes)
+        self._n += len(lotes)
+        partes.append(texto[pos:])
+        res = b"".join(partes)
+        return res.decode("utf-8") if es_str else res
+
+def _extraer_lotes(xml: Union[str, bytes]) -> Tuple[Union[str, bytes], Optional[Dict[str, list]]]:
+    """procesar() de un documento entero: (documento, lotes). Si no hay dos
+    <int> o <double> seguidos ni se corre la expresion regular, y un
+    bytearray o memoryview se devuelve tal cual (sin copiarlo a bytes)."""
+    if len(xml) < _MIN_BYTES_LOTE:
+        return xml, None
+    if isinstance(xml, str):
+        hay = _SEP_INT in xml or _SEP_DOUBLE in xml
+    else:
+        hay = any(buscar(xml) for buscar in _BUSCAR_SEPS)
+    if not hay:
+        return xml, None
+    extractor = _ExtractorLotes()
+    return extractor.procesar(xml), extractor.lotes
+
+# -----------------------------
+# Decodificador por eventos
+# -----------------------------
+
+# Arma los valores de Python directamente desde los eventos de expat, en una
+# sola pasada y sin construir un arbol: cada elemento abierto es un frame en una
+# pila y al cerrarse entrega su resultado al frame padre. Replica exactamente lo
+# que devuelven deserializacion() y los find/findall de las funciones parsear_*.
+
+_SIN = object()  # "todavia no se vio este hijo"
+
+def _a_int(texto: str) -> int:
+    try:
+        return int(texto.strip())
+    except ValueError:
+        return 0
+
+def _a_float(texto: str) -> float:
+    try:
+        return float(texto.strip())
+    except ValueError:
+        return 0.0
+
+def _a_fecha(texto: str) -> Any:
+    try:
+        return datetime.strptime(texto.strip(), "%Y%m%dT%H:%M:%S")
+    except ValueError:
+        return texto
+
+_ESCALARES: Dict[str, Callable[[str], Any]] = {
+    "int": _a_int,
+    "i4": _a_int,
+    "boolean": lambda t: t.strip() in ("1", "true", "True"),
+    "double": _a_float,
+    "string": lambda t: t,
+    "dateTime.iso8601": _a_fecha,
+    "base64": binascii.a2b_base64,
+}
+
+_TIPOS_VALUE = set(_ESCALARES) | {"array", "struct"}
+
+# Acumulador inicial de cada tipo de elemento
+_ACUMULADORES: Dict[str, Callable[[], Any]] = {
+    "data": list,
+    "struct": list,
+    "params": list,
+    "member": lambda: [_SIN, _SIN],
+    "methodCall": lambda: [_SIN, []],
+    "methodResponse": lambda: [_SIN, _SIN],
+}
+
+def _texto(frame: list) -> str:
+    return "".join(frame[1])
+
+def _fin_value(frame: list) -> Any:
+    # <value>texto</value> sin tipo es un string
+    return _texto(frame) if frame[3] is _SIN else frame[3]
+
+def _fin_struct(frame: list) -> Dict[Any, Any]:
+    return {("" if nom is _SIN else nom): (None if val is _SIN else val) for nom, val in frame[3]}
+
+_FINALES: Dict[str, Callable[[list], Any]] = {
+    "value": _fin_value,
+    "array": lambda f: [] if f[3] is _SIN else f[3],
+    "data": lambda f: f[3],
+    "struct": _fin_struct,
+    "member": lambda f: f[3],
+    "param": lambda f: f[3],
+    "params": lambda f: f[3],
+    # fault/value/struct: si el valor no es un struct el fault queda vacio
+    "fault": lambda f: f[3] if isinstance(f[3], dict) else {},
+    "methodCall": lambda f: f[3],
+    "methodResponse": lambda f: f[3],
+    _LOTE: lambda f: f[3],
+}
+
+_FINALES_ARREGLOS = dict(_FINALES, data=lambda f: _a_arreglo(f[3]))
+
+def _entregar_primero(padre: list, tag: str, res: Any) -> None:
+    if padre[3] is _SIN:
+        padre[3] = res
+
+def _entregar_si(tag_hijo: str, fn: Callable[[list, str, Any], None]):
+    def entregar(padre: list, tag: str, res: Any) -> None:
+        if tag == tag_hijo:
+            fn(padre, tag, res)
+    return entregar
+
+def _agregar(padre: list, tag: str, res: Any) -> None:
+    padre[3].append(res)
+
+def _entregar_data(padre: list, tag: str, res: Any) -> None:
+    if tag == "value":
+        padre[3].append(res)
+    elif tag == _LOTE and res is not _SIN:
+        padre[3].extend(res)
+
+def _entregar_member(padre: list, tag: str, res: Any) -> None:
+    # Como el .text de ET: None si el elemento no tiene texto
+    if tag == "name" and padre[3][0] is _SIN:
+        padre[3][0] = res or None
+    elif tag == "value" and padre[3][1] is _SIN:
+        padre[3][1] = res
+
+def _entregar_llamado(padre: list, tag: str, res: Any) -> None:
+    if tag == "methodName" and padre[3][0] is _SIN:
+        padre[3][0] = res or None
+    elif tag == "params":
+        padre[3][1].extend(res)
+
+def _entregar_respuesta(padre: list, tag: str, res: Any) -> None:
+    if tag == "fault" and padre[3][0] is _SIN:
+        padre[3][0] = res
+    elif tag == "params" and padre[3][1] is _SIN:
+        # ./params/param/value: el primer param que tenga value
+        for val in res:
+            if val is not _SIN:
+                padre[3][1] = val
+                break
+
+# Qué hace cada elemento con el resultado de un hijo que se cierra
+_ENTREGAS: Dict[str, Callable[[list, str, Any], None]] = {
+    "value": _entregar_primero,
+    "array": _entregar_si("data", _entregar_primero),
+    "data": _entregar_data,
+    "struct": _entregar_si("member", _agregar),
+    "member": _entregar_member,
+    "param": _entregar_si("value", _entregar_primero),
+    "params": _entregar_si("param", _agregar),
+    "fault": _entregar_si("value", _entregar_primero),
+    "methodCall": _entregar_llamado,
+    "methodResponse": _entregar_respuesta,
+}
+
+class DecodificadorXMLRPC:
+    """Decodificador incremental por eventos (expat) de documentos XML-RPC.
+
+    alimentar() recibe bytes (o str) en pedazos; al terminar el documento, raiz
+    queda como (tag_raiz, resultado). Los errores de expat se lanzan como
+    ET.ParseError, igual que con ElementTree. arreglos=True como en
+    deserializacion().
+    """
+
+    def __init__(self, arreglos: bool = False):
+        self._parser = expat.ParserCreate()
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._inicio
+        self._parser.EndElementHandler = self._fin
+        self._parser.CharacterDataHandler = self._caracteres
+        # frame = [tag, textos, tiene_hijos, acumulado]
+        self._pila: List[list] = []
+        self.raiz: Optional[Tuple[str, Any]] = None
+        self._finales = _FINALES_ARREGLOS if arreglos else _FINALES
+        self._extractor = _ExtractorLotes()
+
+    def alimentar(self, data: Union[str, bytes], final: bool = False) -> None:
+        try:
+            self._parser.Parse(self._extractor.procesar(data), final)
+        except expat.ExpatError as e:
+            err = ET.ParseError(f"{expat.ErrorString(e.code)}: line {e.lineno}, column {e.offset}")
+            err.code = e.code
+            err.position = (e.lineno, e.offset)
+            raise err from None
+
+    def _inicio(self, tag: str, attrs: Dict[str, str]) -> None:
+        pila = self._pila
+        if pila:
+            pila[-1][2] = True
+        acum = _ACUMULADORES.get(tag)
+        if acum is not None:
+            pila.append([tag, [], False, acum()])
+        elif tag == _LOTE:
+            pila.append([tag, [], False, self._extractor.lotes.pop(attrs.get("n"), _SIN)])
+        else:
+            pila.append([tag, [], False, _SIN])
+
+    def _caracteres(self, texto: str) -> None:
+        frame = self._pila[-1]
+        # Como ET: solo cuenta el texto anterior al primer hijo
+        if not frame[2]:
+            frame[1].append(texto)
+
+    def _fin(self, tag: str) -> None:
+        frame = self._pila.pop()
+        fin = self._finales.get(tag)
+        if fin is not None:
+            res = fin(frame)
+        else:
+            escalar = _ESCALARES.get(tag)
+            res = escalar(_texto(frame)) if escalar is not None else _texto(frame)
+        if self._pila:
+            padre = self._pila[-1]
+            if padre[0] == "value" and tag not in _TIPOS_VALUE:
+                # Un tipo desconocido dentro de <value> vale su texto
+                res = _texto(frame)
+            entregar = _ENTREGAS.get(padre[0])
+            if entregar is not None:
+                entregar(padre, tag, res)
+        else:
+            self.raiz = (tag, res)
+
+def _llamado_desde_raiz(raiz: Tuple[str, Any]) -> Tuple[str, List[Any]]:
+    tag, res = raiz
+    if tag != "methodCall":
+        raise ValueError("XML-RPC: método inválido")
+    method, params = res
+    if method is _SIN or not (method or "").strip():
+        raise ValueError("XML-RPC: método inválido")
+    return method.strip(), [None if p is _SIN else p for p in params]
+
+def _respuesta_desde_raiz(raiz: Tuple[str, Any]) -> Tuple[bool, Any]:
+    tag, res = raiz
+    if tag != "methodResponse":
+        raise ValueError("XML-RPC: respuesta inválida")
+    fault, valor = res
+    if fault is not _SIN:
+        return False, fault
+    return True, None if valor is _SIN else valor
 
 # -----------------------------
 # HTTP
 # -----------------------------
 
-def construir_llamado_http(host: str, data: str) -> bytes:
-    data_bytes = data.encode()
+# Compresión del cuerpo (Content-Encoding): por debajo de MIN_COMPRIMIR bytes no
+# conviene, el encabezado gzip y el costo de CPU superan lo que se ahorra
+MIN_COMPRIMIR = 1024
+NIVEL_COMPRESION = 6
+# wbits de zlib: gzip lleva encabezado gzip; "deflate" en HTTP es formato zlib
+_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def comprimir(data: bytes, codificacion: str, nivel: int = NIVEL_COMPRESION) -> bytes:
+    c = zlib.compressobj(nivel, zlib.DEFLATED, _WBITS[codificacion])
+    return c.compress(data) + c.flush()
+
+
+def descomprimir(data: bytes, codificacion: str) -> bytes:
+    """Descomprime un cuerpo completo; lanza ValueError si la codificacion no se
+    soporta o los datos estan corruptos."""
+    d = Descompresor(codificacion)
+    partes: List[bytes] = []
+    d.destino = partes.append
+    d.alimentar(data)
+    d.terminar()
+    return b"".join(partes)
+
+
+def elegir_codificacion(accept_encoding: Optional[str]) -> Optional[str]:
+    """Elige gzip o deflate segun Accept-Encoding (respetando q=0); None si ninguna."""
+    if not accept_encoding:
+        return None
+    aceptadas = {}
+    for item in accept_encoding.split(","):
+        nombre, _, params = item.partition(";")
+        q = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        aceptadas[nombre.strip().lower()] = q
+    for cod in ("gzip", "deflate"):
+        if aceptadas.get(cod, aceptadas.get("*", 0.0)) > 0:
+            return cod
+    return None
+
+
+class Descompresor:
+    """Descomprime un cuerpo gzip/deflate a medida que llega.
+
+    Cada pedazo descomprimido (de a lo sumo tam bytes, asi un cuerpo muy
+    comprimido no se expande de golpe en memoria) se pasa a destino, por
+    ejemplo ParserLlamado.alimentar. Como ParserLlamado, un error no corta la
+    lectura del cuerpo: se guarda y lo lanza terminar().
+    """
+
+    def __init__(self, codificacion: str, destino: Optional[Callable[[bytes], None]] = None,
+                 tam: int = 65536):
+        wbits = _WBITS.get(codificacion.strip().lower())
+        if wbits is None:
+            raise ValueError(f"Content-Encoding no soportado: {codificacion}")
+        self._d = zlib.decompressobj(wbits)
+        self.destino = destino
+        self.tam = tam
+        self.error: Optional[ValueError] = None
+
+    def alimentar(self, data: bytes) -> None:
+        if self.error is not None:
+            return
+        try:
+            pedazo = self._d.decompress(data, self.tam)
+            while pedazo:
+                self.destino(pedazo)
+                pedazo = self._d.decompress(self._d.unconsumed_tail, self.tam)
+        except zlib.error as e:
+            self.error = ValueError(f"Cuerpo comprimido inválido: {e}")
+
+    def terminar(self) -> None:
+        """Lanza ValueError si el cuerpo comprimido estaba corrupto o incompleto."""
+        if self.error is not None:
+            raise self.error
+        if not self._d.eof:
+            raise ValueError("Cuerpo comprimido incompleto")
+
+def construir_llamado_http(host: str, data: Union[str, bytes], keep_alive: bool = False,
+                           compresion: bool = False, min_comprimir: int = MIN_COMPRIMIR,
+                           nivel: int = NIVEL_COMPRESION) -> bytes:
+    return b"".join(construir_llamado_http_partes(host, data, keep_alive, compresion, min_comprimir, nivel))
+
+def construir_llamado_http_partes(host: str, data: Union[str, bytes], keep_alive: bool = False,
+                                  compresion: bool = False, min_comprimir: int = MIN_COMPRIMIR,
+                                  nivel: int = NIVEL_COMPRESION) -> List[bytes]:
+    """Como construir_llamado_http pero devuelve [encabezado, cuerpo] sin unirlos,
+    para enviarlos con un solo sendmsg sin copiar el cuerpo. data puede venir
+    ya codificada en bytes."""
+    data_bytes = data.encode() if isinstance(data, str) else data
     encabezados = [
         "POST / HTTP/1.1",
         f"Host: {host}",
         "User-Agent: xmlrpc_redes/1.0",
         "Content-Type: text/xml",
+    ]
+    if compresion:
+        # Se aceptan respuestas comprimidas y se comprime el cuerpo si es grande
+        encabezados.append("Accept-Encoding: gzip, deflate")
+        if len(data_bytes) >= min_comprimir:
+            data_bytes = comprimir(data_bytes, "gzip", nivel)
+            encabezados.append("Content-Encoding: gzip")
+    encabezados += [
         f"Content-Length: {len(data_bytes)}",
-        "Connection: close",
+        "Connection: keep-alive" if keep_alive else "Connection: close",
         "\r\n"
     ]
     encabezado = "\r\n".join(encabezados).encode()
-    return encabezado + data_bytes
+    return [encabezado, data_bytes]
 
 def parsear_llamado_http(resp: bytes) -> Tuple[str, Dict[str, str], bytes]:
     sep = b"\r\n\r\n"
@@ -347,18 +1116,325 @@ def parsear_llamado_http(resp: bytes) -> Tuple[str, Dict[str, str], bytes]:
             encabezados[k.strip().lower()] = v.strip()
     return llamado, encabezados, cuerpo
 
-def construir_respuesta_http(data: str) -> bytes:
+def construir_respuesta_http(data: str, cerrar: bool = True, codificacion: Optional[str] = None,
+                             min_comprimir: int = MIN_COMPRIMIR, nivel: int = NIVEL_COMPRESION) -> bytes:
+    return b"".join(construir_respuesta_http_partes(data, cerrar, codificacion, min_comprimir, nivel))
+
+def construir_respuesta_http_partes(data: str, cerrar: bool = True, codificacion: Optional[str] = None,
+                                    min_comprimir: int = MIN_COMPRIMIR,
+                                    nivel: int = NIVEL_COMPRESION) -> List[bytes]:
+    """Como construir_respuesta_http pero devuelve [encabezado, cuerpo] sin unirlos."""
     data_bytes = data.encode()
     encabezados = [
         "HTTP/1.1 200 OK",
         "Content-Type: text/xml",
+    ]
+    if codificacion is not None and len(data_bytes) >= min_comprimir:
+        data_bytes = comprimir(data_bytes, codificacion, nivel)
+        encabezados.append(f"Content-Encoding: {codificacion}")
+    encabezados += [
         f"Content-Length: {len(data_bytes)}",
-        "Connection: close",
+        "Connection: close" if cerrar else "Connection: keep-alive",
         "\r\n"
     ]
     encabezado = "\r\n".join(encabezados).encode()
-    return encabezado + data_bytes
+    return [encabezado, data_bytes]
+
+class EscritorChunked:
+    """Respuesta HTTP con Transfer-Encoding: chunked para un cuerpo que se va
+    produciendo (ver iterar_respuesta_xml).
+
+    encabezado(), pedazo(data) y terminar() devuelven buffers para enviar_partes
+    o writelines. Con codificacion el cuerpo se comprime en el camino, con
+    Z_SYNC_FLUSH en cada pedazo para que el cliente lo pueda descomprimir
+    apenas llega.
+    """
+
+    def __init__(self, cerrar: bool = True, codificacion: Optional[str] = None,
+                 nivel: int = NIVEL_COMPRESION):
+        self.cerrar = cerrar
+        self.codificacion = codificacion
+        self._c = None
+        if codificacion is not None:
+            self._c = zlib.compressobj(nivel, zlib.DEFLATED, _WBITS[codificacion])
+
+    def encabezado(self) -> bytes:
+        encabezados = [
+            "HTTP/1.1 200 OK",
+            "Content-Type: text/xml",
+        ]
+        if self._c is not None:
+            encabezados.append(f"Content-Encoding: {self.codificacion}")
+        encabezados += [
+            "Transfer-Encoding: chunked",
+            "Connection: close" if self.cerrar else "Connection: keep-alive",
+            "\r\n"
+        ]
+        return "\r\n".join(encabezados).encode()
+
+    def pedazo(self, data: str) -> List[bytes]:
+        datos = data.encode()
+        if self._c is not None:
+            datos = self._c.compress(datos) + self._c.flush(zlib.Z_SYNC_FLUSH)
+        return _chunk(datos)
+
+    def terminar(self) -> List[bytes]:
+        partes = _chunk(self._c.flush()) if self._c is not None else []
+        partes.append(b"0\r\n\r\n")
+        return partes
+
+def _chunk(datos: bytes) -> List[bytes]:
+    # Un chunk vacio marcaria el final del cuerpo
+    return [b"%X\r\n" % len(datos), datos, b"\r\n"] if datos else []
 
 def parsear_respuesta_http(resp: bytes) -> Tuple[str, Dict[str, str], bytes]:
     """Igual que parsear_llamado_http pero para respuestas HTTP."""
     return parsear_llamado_http(resp)
+
+def conexion_persistente(llamado: str, encabezados: Dict[str, str]) -> bool:
+    """Indica si la conexión puede reutilizarse después de este mensaje.
+
+    En HTTP/1.1 la conexión es persistente salvo que se pida "Connection: close";
+    en HTTP/1.0 solo lo es si se pide explícitamente "Connection: keep-alive".
+    """
+    tokens = {t.strip().lower() for t in encabezados.get("connection", "").split(",")}
+    if "close" in tokens:
+        return False
+    if "HTTP/1.0" in llamado:
+        return "keep-alive" in tokens
+    return True
+
+
+# Limites del bloque de encabezados que acepta LectorHTTP
+MAX_ENCABEZADO = 64 * 1024
+MAX_ENCABEZADOS = 100
+_MAX_LINEA_CHUNK = 1024
+# Solo digitos hexadecimales: int(x, 16) tambien acepta "_", signo y espacios
+_RE_TAM_CHUNK = re.compile(rb"[0-9A-Fa-f]+")
+
+# Estados de LectorHTTP
+_ENCABEZADO, _CUERPO, _HASTA_CIERRE, _TAMANO_CHUNK, _DATOS_CHUNK, _FIN_CHUNK, _TRAILER, _FIN = range(8)
+
+
+class ErrorHTTP(ValueError):
+    """Mensaje HTTP mal formado o que excede los limites de LectorHTTP."""
+
+
+class LectorHTTP:
+    """Separa mensajes HTTP/1.1 (llamados, o respuestas con respuesta=True) de
+    un flujo de bytes que llega de a pedazos.
+
+    alimentar(data) agrega lo recibido; encabezado() devuelve True cuando el
+    bloque de encabezados esta completo (se parsea una sola vez, recordando hasta
+    donde ya se busco el separador) y deja llamado, encabezados, largo y chunked.
+    Despues cuerpo() devuelve los pedazos del cuerpo delimitado por
+    Content-Length o Transfer-Encoding: chunked hasta que terminado sea True, y
+    siguiente() pasa al proximo mensaje conservando lo que sobro (pipelining).
+
+    Si el buffer esta vacio, restantes dice cuantos bytes del cuerpo pueden
+    leerse directo del socket (sin pasar por el buffer) informandolos con
+    descontar(n).
+    """
+
+    def __init__(self, respuesta: bool = False, max_encabezado: int = MAX_ENCABEZADO,
+                 max_encabezados: int = MAX_ENCABEZADOS):
+        self.respuesta = respuesta
+        self.max_encabezado = max_encabezado
+        self.max_encabezados = max_encabezados
+        self._buf = bytearray()
+        self._pos = 0       # comienzo de lo que todavia no se consumio
+        self._buscado = 0   # hasta donde ya se busco el fin del encabezado
+        self._reiniciar()
+
+    def _reiniciar(self) -> None:
+        self.llamado = ""
+        self.encabezados: Dict[str, str] = {}
+        self.largo: Optional[int] = None
+        self.chunked = False
+        self.terminado = False
+        self._faltan = 0    # bytes que faltan del cuerpo o del chunk actual
+        self._estado = _ENCABEZADO
+
+    @property
+    def pendientes(self) -> int:
+        """Bytes recibidos que todavia no se consumieron."""
+        return len(self._buf) - self._pos
+
+    @property
+    def restantes(self) -> int:
+        """Bytes del cuerpo que se pueden leer directo del socket (0 si hay datos
+        en el buffer o si el lector necesita ver los bytes para delimitar)."""
+        if self._estado in (_CUERPO, _DATOS_CHUNK) and self._pos == len(self._buf):
+            return self._faltan
+        return 0
+
+    def alimentar(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        if self._pos == len(self._buf):
+            self._buf.clear()
+            self._buscado -= self._pos
+            self._pos = 0
+        elif self._pos > 65536:
+            del self._buf[:self._pos]
+            self._buscado -= self._pos
+            self._pos = 0
+        self._buf += data
+
+    def encabezado(self) -> bool:
+        """True si ya se tiene el encabezado del mensaje actual; lanza ErrorHTTP
+        si es invalido o supera los limites."""
+        if self._estado != _ENCABEZADO:
+            return True
+        buf = self._buf
+        # Se toleran lineas vacias antes del mensaje (RFC 9112, 2.2)
+        while buf.startswith(b"\r\n", self._pos):
+            self._pos += 2
+        fin = buf.find(b"\r\n\r\n", max(self._pos, self._buscado - 3))
+        if fin == -1:
+            self._buscado = len(buf)
+            if self.pendientes > self.max_encabezado:
+                raise ErrorHTTP("Encabezados HTTP demasiado grandes")
+            return False
+        if fin - self._pos > self.max_encabezado:
+            raise ErrorHTTP("Encabezados HTTP demasiado grandes")
+        bloque = buf[self._pos:fin].decode("latin-1")
+        self._pos = fin + 4
+        self._parsear_encabezado(bloque)
+        return True
+
+    def _parsear_encabezado(self, bloque: str) -> None:
+        lineas = bloque.split("\r\n")
+        if len(lineas) - 1 > self.max_encabezados:
+            raise ErrorHTTP("Demasiados encabezados HTTP")
+        self.llamado = lineas[0]
+        encabezados = self.encabezados
+        for ln in lineas[1:]:
+            k, sep, v = ln.partition(":")
+            if not sep:
+                continue
+            k = k.strip().lower()
+            v = v.strip()
+            anterior = encabezados.get(k)
+            # Los encabezados repetidos se combinan como lista (RFC 9110, 5.3)
+            encabezados[k] = v if anterior is None else f"{anterior}, {v}"
+
+        te = encabezados.get("transfer-encoding")
+        cl = encabezados.get("content-length")
+        if te is not None:
+            # Con Transfer-Encoding se ignora Content-Length
+            if te.split(",")[-1].strip().lower() != "chunked":
+                raise ErrorHTTP("Transfer-Encoding no soportado")
+            self.chunked = True
+            self._estado = _TAMANO_CHUNK
+        elif cl is not None:
+            if not (cl.isascii() and cl.isdigit()):
+                raise ErrorHTTP("Error en los encabezados HTTP")
+            self.largo = self._faltan = int(cl)
+            self._estado = _CUERPO
+            if self.largo == 0:
+                self._terminar()
+        elif self.respuesta:
+            # Respuesta sin delimitar: el cuerpo termina cuando se cierra la conexion
+            self._estado = _HASTA_CIERRE
+        else:
+            self.largo = 0
+            self._terminar()
+
+    def cuerpo(self) -> Union[bytes, bytearray]:
+        """Siguiente pedazo del cuerpo que ya esta en el buffer; b"" si hacen falta
+        mas datos o si el cuerpo termino. Lanza ErrorHTTP si un chunk es invalido."""
+        buf = self._buf
+        while True:
+            estado = self._estado
+            disponible = len(buf) - self._pos
+            if estado == _CUERPO or estado == _DATOS_CHUNK:
+                n = min(self._faltan, disponible)
+                if not n:
+                    return b""
+                pedazo = buf[self._pos:self._pos + n]
+                self._pos += n
+                self._faltan -= n
+                if not self._faltan:
+                    self._fin_datos()
+                return pedazo
+            if estado == _HASTA_CIERRE:
+                if not disponible:
+                    return b""
+                pedazo = buf[self._pos:]
+                self._pos = len(buf)
+                return pedazo
+            if estado == _FIN_CHUNK:
+                if disponible < 2:
+                    return b""
+                if not buf.startswith(b"\r\n", self._pos):
+                    raise ErrorHTTP("Chunk HTTP inválido")
+                self._pos += 2
+                self._estado = _TAMANO_CHUNK
+            elif estado == _TAMANO_CHUNK or estado == _TRAILER:
+                fin = buf.find(b"\r\n", self._pos)
+                if fin == -1:
+                    if disponible > _MAX_LINEA_CHUNK:
+                        raise ErrorHTTP("Chunk HTTP inválido")
+                    return b""
+                linea = bytes(buf[self._pos:fin])
+                self._pos = fin + 2
+                if estado == _TRAILER:
+                    # Los trailers se ignoran; una linea vacia termina el mensaje
+                    if not linea:
+                        self._terminar()
+                    continue
+                tam, ext, _ = linea.partition(b";")
+                if ext:
+                    # Antes de una extension puede haber espacios (BWS)
+                    tam = tam.rstrip(b" \t")
+                if not _RE_TAM_CHUNK.fullmatch(tam):
+                    raise ErrorHTTP("Chunk HTTP inválido")
+                self._faltan = int(tam, 16)
+                self._estado = _DATOS_CHUNK if self._faltan else _TRAILER
+            else:
+                return b""
+
+    def leer_en(self, vista: memoryview) -> int:
+        """Copia en vista el cuerpo que ya esta en el buffer (hasta len(vista));
+        devuelve los bytes copiados."""
+        if self._estado not in (_CUERPO, _DATOS_CHUNK):
+            return 0
+        n = min(len(vista), self._faltan, len(self._buf) - self._pos)
+        vista[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        self._faltan -= n
+        if n and not self._faltan:
+            self._fin_datos()
+        return n
+
+    def descontar(self, n: int) -> None:
+        """Registra n bytes del cuerpo leidos directo del socket (ver restantes)."""
+        if not n:
+            return
+        if n > self.restantes:
+            raise ValueError("LectorHTTP: se descontaron mas bytes que los restantes")
+        self._faltan -= n
+        if not self._faltan:
+            self._fin_datos()
+
+    def cerrar(self) -> bool:
+        """Avisa que el otro extremo cerro la conexion; devuelve terminado."""
+        if self._estado == _HASTA_CIERRE:
+            self._terminar()
+        return self.terminado
+
+    def siguiente(self) -> None:
+        """Pasa al proximo mensaje; lo que sobro del buffer es su comienzo."""
+        del self._buf[:self._pos]
+        self._pos = 0
+        self._buscado = 0
+        self._reiniciar()
+
+    def _fin_datos(self) -> None:
+        if self._estado == _CUERPO:
+            self._terminar()
+        else:
+            self._estado = _FIN_CHUNK
+
+    def _terminar(self) -> None:
+        self._estado = _FIN
+        self.terminado = True